@@ -0,0 +1,252 @@
+"""资源清单：离线探测剧情和第一章用到的每个视频片段（帧率、帧数、尺寸、时长、关键帧数、音频时长），
+保存为紧凑的 res/manifest.json。启动时只按文件大小和修改时间校验清单（不打开视频），缺失的资源在标题画面就能发现；
+播放时直接使用清单中的帧率和帧数，不再重新探测；清单中记录了分辨率版本（见 transcode_ladder.py）时按屏幕选用。
+
+生成清单（多进程并行探测，顺便为每个视频建立关键帧索引）：
+    python asset_manifest.py [--workers N]
+只做启动时的校验：
+    python asset_manifest.py --check
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import asset_pack
+
+MANIFEST_PATH = os.path.join("res", "manifest.json")
+STORY_PATH = "story.json"
+CHAPTER_ONE = ("res/chapter_one.mp4", "res/chapter_one.mp3")
+VERSION = 1
+
+
+def story_assets(story_path=STORY_PATH, base=""):
+    """剧情（第二、三章）和第一章用到的 (视频, 音频) 对，音频可能为 None（使用视频中的音轨），去重并保持顺序"""
+    from story import load_story
+
+    # 第一章的音频文件已合并进视频时（见 mux_assets.py）使用视频中的音轨，与 main.py 一致
+    video, audio = CHAPTER_ONE
+    pairs = [(video, audio if asset_pack.exists(os.path.join(base, audio)) else None)]
+    graph = load_story(story_path)
+    for node, kind in zip(graph.nodes, graph.kinds):
+        if kind == "clip":
+            pairs.append((node["video"], node.get("audio")))
+    return list(dict.fromkeys(pairs))
+
+
+def stamp(path):
+    """文件（或资源包中的资源）的 (大小, 修改时间纳秒)，不存在时返回 None"""
+    try:
+        return list(asset_pack.stat(path))
+    except OSError:
+        return None
+
+
+def media_duration(path, container=False):
+    """用本地 ffmpeg 读取音频时长（秒）；container 为 True 时只在文件中有音轨时返回。没有 ffmpeg 时返回 None"""
+    from audio_cache import ffmpeg_path
+
+    executable = ffmpeg_path()
+    if executable is None:
+        return None
+    result = subprocess.run([executable, "-hide_banner", "-nostdin", "-i", asset_pack.ffmpeg_input(path)],
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    text = result.stderr.decode("utf-8", "replace")
+    if container and "Audio:" not in text:
+        return None
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", text)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return round(int(hours) * 3600 + int(minutes) * 60 + float(seconds), 3)
+
+
+def probe(pair):
+    """探测一个片段（在工作进程中运行），返回 (视频路径, 清单条目或错误信息)"""
+    import cv2
+    from keyframe_index import KeyframeStore
+
+    video_path, audio_path = pair
+    video_stamp = stamp(video_path)
+    if video_stamp is None:
+        return video_path, "视频文件不存在"
+    cap = asset_pack.open_video(video_path)
+    if not cap.isOpened():
+        cap.release()
+        return video_path, "无法打开视频文件"
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    # 关键帧索引同时给出准确的帧数（逐包统计），并保存到缓存目录供跳转使用
+    index = KeyframeStore().get(video_path)
+    if index is None:
+        return video_path, "无法读取视频数据"
+    entry = {"stamp": video_stamp, "fps": index.fps, "frames": index.frame_count, "width": width, "height": height,
+             "duration": round(index.frame_count / index.fps, 3), "keyframes": len(index.frames)}
+    if audio_path:
+        entry["audio"] = audio_path
+        entry["audio_stamp"] = stamp(audio_path)
+        if entry["audio_stamp"] is None:
+            return video_path, f"音频文件不存在: {audio_path}"
+        entry["audio_duration"] = media_duration(audio_path)
+    else:
+        entry["audio_duration"] = media_duration(video_path, container=True)
+    return video_path, entry
+
+
+class AssetManifest:
+    """已加载的资源清单：clips 为 {相对路径: 条目}，preflight 之后只有与文件一致的条目可用"""
+
+    def __init__(self, clips=None, base=""):
+        self.clips = clips or {}
+        self.base = os.path.abspath(base)  # 清单中的路径相对于该目录（打包后为 sys._MEIPASS）
+        self.valid = set(self.clips)
+        # 各视频可用的分辨率版本，preflight 之后只保留与文件一致的
+        self.variants = {key: entry.get("variants", []) for key, entry in self.clips.items()}
+        self.stale_variants = 0  # preflight 发现缺失或已过期的分辨率版本数
+        self.missing = []  # preflight 发现缺失的文件
+        self.stale = []  # preflight 发现清单已过期或未收录的视频
+        # 打包后资源每次启动都重新解压到临时目录，修改时间会变化，只比较文件大小
+        self.check_mtime = not getattr(sys, "frozen", False)
+
+    @classmethod
+    def load(cls, path, base=""):
+        """读取清单，不存在或格式不对时返回空清单（播放时照常探测）"""
+        try:
+            data = json.loads(asset_pack.read_bytes(path))
+        except (OSError, ValueError):
+            return cls(base=base)
+        if not isinstance(data, dict) or data.get("version") != VERSION:
+            return cls(base=base)
+        return cls(data.get("clips", {}), base)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "clips": self.clips}, f, ensure_ascii=False, separators=(",", ":"))
+
+    def key(self, path):
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.base)
+        return path.replace("\\", "/")
+
+    def get(self, video_path):
+        """视频的清单条目，没有或已与文件不一致时返回 None"""
+        key = self.key(video_path)
+        return self.clips[key] if key in self.valid else None
+
+    def variant(self, video_path, screen_width, screen_height):
+        """播放时解码的文件：保持宽高比缩放到屏幕内的显示尺寸（与 VideoLayout 一致）不超过某个分辨率版本时，
+        选用其中最小的版本，否则（或没有分辨率版本时）返回原视频路径"""
+        entry = self.get(video_path)
+        if entry is None:
+            return video_path
+        aspect_ratio = entry["width"] / entry["height"]
+        target_width, target_height = screen_width, int(screen_width / aspect_ratio)
+        if target_height > screen_height:
+            target_width, target_height = int(screen_height * aspect_ratio), screen_height
+        for variant in sorted(self.variants.get(self.key(video_path), ()), key=lambda v: v["height"]):
+            if variant["width"] >= target_width and variant["height"] >= target_height:
+                path = variant["path"]
+                return os.path.join(self.base, path) if os.path.isabs(video_path) else path
+        return video_path
+
+    def matches(self, recorded, current):
+        if recorded is None or current is None:
+            return recorded == current
+        return recorded == current if self.check_mtime else recorded[0] == current[0]
+
+    def preflight(self, assets):
+        """启动时校验：assets 为 [(视频, 音频), ...]，只检查文件是否存在及大小、修改时间是否与清单一致。
+        缺失的文件记录在 missing，清单过期或未收录的视频记录在 stale（这些条目不再使用）"""
+        self.missing = missing = []
+        self.stale = stale = []
+        self.valid = set()
+        self.variants = {}
+        self.stale_variants = 0
+        for video_path, audio_path in assets:
+            key = self.key(video_path)
+            video_stamp = stamp(os.path.join(self.base, key))
+            if video_stamp is None:
+                missing.append(key)
+                continue
+            audio_stamp = None
+            if audio_path:
+                audio_stamp = stamp(os.path.join(self.base, self.key(audio_path)))
+                if audio_stamp is None:
+                    missing.append(self.key(audio_path))
+            entry = self.clips.get(key)
+            if (entry is None or not self.matches(entry["stamp"], video_stamp)
+                    or not self.matches(entry.get("audio_stamp"), audio_stamp)):
+                stale.append(key)
+            else:
+                self.valid.add(key)
+                variants = entry.get("variants", [])
+                self.variants[key] = [variant for variant in variants
+                                      if self.matches(variant["stamp"], stamp(os.path.join(self.base, variant["path"])))]
+                self.stale_variants += len(variants) - len(self.variants[key])
+
+
+def preflight(base="", manifest_path=None, story_path=None):
+    """加载清单并校验剧情用到的所有资源，输出问题和耗时，返回校验后的 AssetManifest"""
+    start = time.perf_counter()
+    manifest = AssetManifest.load(manifest_path or os.path.join(base, MANIFEST_PATH), base)
+    try:
+        assets = story_assets(story_path or os.path.join(base, STORY_PATH), base)
+    except (OSError, ValueError) as e:
+        print(f"无法读取剧情文件: {e}")
+        return manifest
+    manifest.preflight(assets)
+    for path in manifest.missing:
+        print(f"资源文件不存在: {path}")
+    if manifest.stale:
+        print(f"资源清单中有 {len(manifest.stale)} 个视频已过期或未收录，播放时重新探测（运行 python asset_manifest.py 更新）")
+    print(f"资源检查: {len(assets)} 个片段，{len(manifest.missing)} 个文件缺失，"
+          f"耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+    if manifest.stale_variants:
+        print(f"有 {manifest.stale_variants} 个分辨率版本缺失或已过期，播放时使用原视频（运行 python transcode_ladder.py 更新）")
+    return manifest
+
+
+def build(workers=None, manifest_path=MANIFEST_PATH, story_path=STORY_PATH):
+    """并行探测所有片段并写入清单（保留已有清单中的分辨率版本，播放时仍会校验），返回出错的片段数"""
+    import multiprocessing
+
+    previous = AssetManifest.load(manifest_path)
+    assets = story_assets(story_path)
+    clips = {}
+    errors = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers or os.cpu_count()) as pool:
+        for video_path, result in pool.imap_unordered(probe, assets):
+            if isinstance(result, str):
+                print(f"{video_path}: {result}")
+                errors += 1
+            else:
+                variants = previous.clips.get(video_path, {}).get("variants")
+                if variants:
+                    result["variants"] = variants
+                clips[video_path] = result
+    manifest = AssetManifest({path: clips[path] for path, _ in assets if path in clips})
+    manifest.save(manifest_path)
+    print(f"已探测 {len(clips)} 个视频（{errors} 个出错），耗时 {time.perf_counter() - start:.1f} 秒，"
+          f"清单已保存到 {manifest_path}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成或校验资源清单")
+    parser.add_argument("--workers", type=int, default=None, help="并行探测的进程数（默认为 CPU 核数）")
+    parser.add_argument("--check", action="store_true", help="只按文件大小和修改时间校验已有清单")
+    args = parser.parse_args()
+    if args.check:
+        manifest = preflight()
+        return 1 if manifest.missing or manifest.stale else 0
+    return 1 if build(args.workers) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
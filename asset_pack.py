@@ -0,0 +1,251 @@
+"""资源包：把 res/ 下的视频、音频和字体打包为一个文件（不压缩，每个文件按 4096 字节对齐），末尾是 JSON 索引。
+运行时用 mmap 打开，只读取索引，不解压到磁盘，启动耗时与资源总大小无关：字体和音频直接从映射的内存中读取，
+视频（OpenCV）和容器音轨（ffmpeg）通过 ffmpeg 的 subfile 协议直接读取资源包中对应的一段。
+
+打包后资源包放在可执行文件旁（开发时放在项目目录，或由环境变量 ASSET_PACK 指定），不再放进 PyInstaller 的单文件包中。
+同名的散装文件（res/ 下）存在时优先使用散装文件。
+
+生成资源包：python asset_pack.py [--output assets.pack] [目录 ...]（默认打包 res）
+"""
+import argparse
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+MAGIC = b"SPACK001"
+HEADER = struct.Struct("<8sQQ")  # 魔数、索引偏移、索引长度
+ALIGN = 4096
+PACK_NAME = "assets.pack"
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+class PackReader(io.BufferedIOBase):
+    """资源包中一个文件的只读视图（直接读取 mmap，不复制整个文件），可交给 pygame 使用"""
+
+    def __init__(self, buffer, offset, size, name):
+        super().__init__()
+        self.buffer = buffer
+        self.offset = offset
+        self.size = size
+        self.name = name
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            position += self.position
+        elif whence == io.SEEK_END:
+            position += self.size
+        self.position = max(0, min(position, self.size))
+        return self.position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.position
+        size = max(0, min(size, self.size - self.position))
+        start = self.offset + self.position
+        self.position += size
+        return self.buffer[start:start + size]
+
+    read1 = read
+
+    def readinto(self, target):
+        view = memoryview(target).cast("B")
+        size = max(0, min(len(view), self.size - self.position))
+        start = self.offset + self.position
+        view[:size] = self.buffer[start:start + size]
+        self.position += size
+        return size
+
+
+class AssetPack:
+    """已打开的资源包：files 为 {相对路径: (偏移, 大小, 原文件修改时间纳秒)}"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._file = open(path, "rb")
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, index_size = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是资源包文件: {path}")
+        index = json.loads(bytes(self.buffer[index_offset:index_offset + index_size]).decode("utf-8"))
+        self.files = {name: tuple(entry) for name, entry in index["files"].items()}
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def open(self, name):
+        offset, size, _ = self.files[name]
+        return PackReader(self.buffer, offset, size, name)
+
+    def read(self, name):
+        offset, size, _ = self.files[name]
+        return self.buffer[offset:offset + size]
+
+    def stat(self, name):
+        """(大小, 修改时间纳秒)，与打包时的原文件一致，用作各类缓存的键"""
+        _, size, mtime_ns = self.files[name]
+        return size, mtime_ns
+
+    def ffmpeg_input(self, name):
+        """ffmpeg 的 subfile 协议地址，直接读取资源包中的一段（OpenCV 的 FFmpeg 后端和 ffmpeg 命令行都可使用）"""
+        offset, size, _ = self.files[name]
+        return f"subfile,,start,{offset},end,{offset + size},,:{self.path}"
+
+
+def resource_base():
+    """散装资源所在的目录（与 runtime.resource_path 一致）"""
+    return getattr(sys, "_MEIPASS", os.path.abspath("."))
+
+
+_pack = None
+_pack_loaded = False
+_pack_lock = threading.Lock()
+
+
+def get_pack():
+    """当前的资源包：环境变量 ASSET_PACK、打包后可执行文件旁或当前目录下的 assets.pack，都没有时返回 None"""
+    global _pack, _pack_loaded
+    with _pack_lock:
+        if not _pack_loaded:
+            _pack_loaded = True
+            candidates = [os.environ.get("ASSET_PACK")]
+            if getattr(sys, "frozen", False):
+                candidates.append(os.path.join(os.path.dirname(sys.executable), PACK_NAME))
+            candidates.append(os.path.abspath(PACK_NAME))
+            for path in candidates:
+                if path and os.path.isfile(path):
+                    try:
+                        _pack = AssetPack(path)
+                    except (OSError, ValueError) as e:
+                        print(f"无法打开资源包 {path}: {e}")
+                        continue
+                    break
+    return _pack
+
+
+def locate(path):
+    """散装文件不存在而资源包中有该资源时返回 (资源包, 包内路径)，否则返回 None"""
+    if os.path.exists(path):
+        return None
+    pack = get_pack()
+    if pack is None:
+        return None
+    name = os.path.relpath(os.path.abspath(path), resource_base()).replace("\\", "/")
+    return (pack, name) if name in pack else None
+
+
+def exists(path):
+    return os.path.isfile(path) or locate(path) is not None
+
+
+def stat(path):
+    """资源的 (大小, 修改时间纳秒)，不存在时抛出 OSError"""
+    located = locate(path)
+    if located is not None:
+        pack, name = located
+        return pack.stat(name)
+    result = os.stat(path)
+    return result.st_size, result.st_mtime_ns
+
+
+def source(path):
+    """可交给 pygame（字体、音频）的来源：散装文件返回路径，资源包中的返回只读文件对象"""
+    located = locate(path)
+    if located is None:
+        return path
+    pack, name = located
+    return pack.open(name)
+
+
+def read_bytes(path):
+    located = locate(path)
+    if located is not None:
+        pack, name = located
+        return pack.read(name)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def open_video(path, params=None):
+    """打开视频：散装文件按路径打开，资源包中的用 subfile 地址交给 FFmpeg 后端读取。params 为 FFmpeg 后端的打开参数。
+    （不用 PackReader：OpenCV 的 Python 流在 release() 时会在未持有 GIL 的情况下释放文件对象，导致进程崩溃）"""
+    import cv2
+
+    located = locate(path)
+    if located is not None:
+        pack, name = located
+        return cv2.VideoCapture(pack.ffmpeg_input(name), cv2.CAP_FFMPEG, params or [])
+    if params is None:
+        return cv2.VideoCapture(path)
+    return cv2.VideoCapture(path, cv2.CAP_FFMPEG, params)
+
+
+def ffmpeg_input(path):
+    """交给 ffmpeg -i 的输入地址"""
+    located = locate(path)
+    if located is not None:
+        pack, name = located
+        return pack.ffmpeg_input(name)
+    return path
+
+
+def build(directories, output):
+    """把 directories 下的所有文件写入资源包 output（包内路径相对于当前目录），返回文件数"""
+    names = []
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                names.append(os.path.relpath(os.path.join(root, file_name)).replace("\\", "/"))
+    names = sorted(set(names) - {os.path.relpath(output).replace("\\", "/")})
+    entries = {}
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _align(HEADER.size))
+        for name in names:
+            offset = f.tell()
+            with open(name, "rb") as source_file:
+                size = 0
+                while True:
+                    chunk = source_file.read(8 * 1024 ** 2)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    size += len(chunk)
+            entries[name] = [offset, size, os.stat(name).st_mtime_ns]
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        index = json.dumps({"files": entries}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index_offset = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, index_offset, len(index)))
+    os.replace(tmp_path, output)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成资源包")
+    parser.add_argument("directories", nargs="*", default=["res"], help="要打包的目录")
+    parser.add_argument("--output", default=PACK_NAME, help="资源包路径")
+    args = parser.parse_args()
+    count = build(args.directories, args.output)
+    print(f"已打包 {count} 个文件到 {args.output}（{os.path.getsize(args.output) / 1024 ** 2:.1f} MB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""PCM 音频缓存：提前（预取片段时、标题画面时）把之后要播放的音频解码为 mixer 输出格式的 PCM，
+内存中按总大小上限保留最近使用的若干首，同时写入缓存目录的 WAV 文件，超出上限或下次启动时直接从文件流式播放。
+播放时在 PCM 数据前加上 WAV 头交给 pygame.mixer.music，不再有解码延迟，并且可以按采样精确地从任意位置开始。
+
+片段没有单独的音频文件时使用视频文件（mp4 等）中的音轨，由本地的 ffmpeg 解码（SDL_mixer 和 OpenCV 都不能读取其中的音频）。
+
+预先解码所有音频：python audio_cache.py [音频或视频文件 ...]（默认为 res/ 下的全部 mp3 和 mp4）
+"""
+import glob
+import hashlib
+import io
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+
+import pygame
+
+import asset_pack
+from av_sync import MusicSource
+from frame_cache import cache_root
+
+WAV_HEADER_SIZE = 44
+# 由 ffmpeg 解码音轨的容器格式，其他格式由 pygame.mixer.Sound 解码
+CONTAINER_EXTENSIONS = (".mp4", ".m4v", ".m4a", ".mov", ".mkv", ".webm")
+# mixer 的采样格式（pygame.mixer.get_init 的 size）对应的 ffmpeg 输出格式
+FFMPEG_FORMATS = {8: "u8", -8: "s8", 16: "u16le", -16: "s16le", 32: "f32le"}
+
+_ffmpeg = None
+
+
+def ffmpeg_path():
+    """本地 ffmpeg 的路径：环境变量 FFMPEG_BINARY、打包后可执行文件旁、PATH，最后是可选的 imageio-ffmpeg。
+    都没有时返回 None"""
+    global _ffmpeg
+    if _ffmpeg is None:
+        candidates = [os.environ.get("FFMPEG_BINARY")]
+        if getattr(sys, "frozen", False):
+            base_path = os.path.dirname(sys.executable)
+            candidates += [os.path.join(base_path, "ffmpeg.exe"), os.path.join(base_path, "ffmpeg")]
+        candidates.append(shutil.which("ffmpeg"))
+        _ffmpeg = next((path for path in candidates if path and os.path.isfile(path)), "")
+        if not _ffmpeg:
+            try:
+                import imageio_ffmpeg
+                _ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+            except (ImportError, RuntimeError):
+                pass
+    return _ffmpeg or None
+
+
+def decode_container(path, rate, channels, size):
+    """用本地 ffmpeg 把视频文件中的第一条音轨解码为 mixer 格式的 PCM；没有 ffmpeg、没有音轨或解码失败时返回 None"""
+    executable = ffmpeg_path()
+    if executable is None:
+        print(f"找不到 ffmpeg，无法播放 {path} 中的音轨（可设置环境变量 FFMPEG_BINARY）")
+        return None
+    command = [executable, "-v", "error", "-nostdin", "-i", asset_pack.ffmpeg_input(path), "-map", "0:a:0", "-vn",
+               "-f", FFMPEG_FORMATS[size], "-ac", str(channels), "-ar", str(rate), "-"]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    except OSError as e:
+        print(f"无法运行 ffmpeg: {e}")
+        return None
+    if result.returncode != 0 or not result.stdout:
+        message = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        print(f"无法解码 {path} 中的音轨: {message[-1] if message else result.returncode}")
+        return None
+    return result.stdout
+
+
+def wav_header(data_size, rate, channels, bits):
+    """标准 44 字节 WAV 头（PCM，小端）"""
+    block = channels * bits // 8
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_size, b"WAVE", b"fmt ", 16, 1, channels, rate,
+                       rate * block, block, bits, b"data", data_size)
+
+
+class PCMStream(io.RawIOBase):
+    """只读的 WAV 文件视图：WAV 头加上 PCM 数据中从 offset 开始的 length 字节。
+    数据来自内存（不复制）或缓存文件，交给 pygame.mixer.music.load 播放"""
+
+    def __init__(self, header, offset, length, data=None, path=None):
+        super().__init__()
+        self.header = header
+        self.offset = offset
+        self.length = length
+        self.data = memoryview(data) if data is not None else None
+        self.file = open(path, "rb") if data is None else None
+        self.size = len(header) + length
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            position += self.position
+        elif whence == io.SEEK_END:
+            position += self.size
+        self.position = max(0, min(position, self.size))
+        return self.position
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        count = 0
+        while count < len(view) and self.position < self.size:
+            if self.position < len(self.header):
+                chunk = self.header[self.position:self.position + len(view) - count]
+                view[count:count + len(chunk)] = chunk
+                read = len(chunk)
+            else:
+                start = self.offset + self.position - len(self.header)
+                wanted = min(len(view) - count, self.size - self.position)
+                if self.data is not None:
+                    view[count:count + wanted] = self.data[start:start + wanted]
+                    read = wanted
+                else:
+                    self.file.seek(start)
+                    read = self.file.readinto(view[count:count + wanted])
+                    if not read:
+                        break
+            count += read
+            self.position += read
+        return count
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.data = None
+        super().close()
+
+
+class PCMTrack:
+    """一首已解码的音频：PCM 数据在内存中（data）或在缓存的 WAV 文件中（path，数据从 offset 开始）"""
+
+    def __init__(self, rate, channels, bits, length, data=None, path=None, offset=WAV_HEADER_SIZE):
+        self.rate = rate
+        self.channels = channels
+        self.bits = bits
+        self.length = length
+        self.data = data
+        self.path = path
+        self.offset = offset if data is None else 0
+
+    @property
+    def frame_bytes(self):
+        return self.channels * self.bits // 8
+
+    @property
+    def duration(self):
+        return self.length / (self.rate * self.frame_bytes)
+
+    def stream(self, start=0.0):
+        """返回从 start 秒（对齐到采样）开始的音频源，交给 pygame.mixer.music.load(source, "wav")。
+        从头播放缓存文件时直接返回文件路径，由 SDL 读取"""
+        skip = min(int(round(start * self.rate)) * self.frame_bytes, self.length)
+        if skip == 0 and self.data is None and self.offset == WAV_HEADER_SIZE:
+            return self.path
+        length = self.length - skip
+        header = wav_header(length, self.rate, self.channels, self.bits)
+        return PCMStream(header, self.offset + skip, length, self.data, self.path)
+
+
+class AudioCache:
+    """解码后的音频缓存。内存中最多保留 max_bytes 字节（按最近使用淘汰），淘汰后改为从缓存文件流式播放；
+    同一首音频同时被多个线程请求时只解码一次，无法解码的文件只尝试一次"""
+
+    def __init__(self, max_bytes=256 * 1024 ** 2, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory or os.path.join(cache_root(), "audio")
+        self.memory = OrderedDict()  # 音频路径 -> 内存中的 PCMTrack
+        self.files = {}  # 音频路径 -> 缓存文件中的 PCMTrack
+        self.used = 0
+        self.failed = set()  # 无法解码（或视频中没有音轨）的路径
+        self._loading = {}  # 音频路径 -> 解码完成时设置的 Event
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """内存上限由环境变量 AUDIO_CACHE_MB 设置（默认 256），为 0 时只使用缓存文件"""
+        try:
+            max_mb = float(os.environ.get("AUDIO_CACHE_MB", "256"))
+        except ValueError:
+            print("AUDIO_CACHE_MB 不是有效的数字，使用默认值 256")
+            max_mb = 256
+        return cls(int(max_mb * 1024 ** 2))
+
+    def key(self, audio_path, mixer_format):
+        size, mtime_ns = asset_pack.stat(audio_path)
+        text = f"{os.path.abspath(audio_path)}|{size}|{mtime_ns}|{mixer_format}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def prepare(self, *audio_paths):
+        """在后台线程中解码，播放时 get 不再等待"""
+        thread = threading.Thread(target=lambda: [self.get(path) for path in audio_paths], name="AudioDecode",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def music(self, video_path, audio_path=None):
+        """片段的音频（MusicSource）：有单独的音频文件时使用它（无法解码时把原文件读入内存，交给 mixer.music 解码），
+        否则使用视频文件中的音轨；都没有时返回 None"""
+        if audio_path:
+            track = self.get(audio_path)
+            data = None
+            if track is None and asset_pack.exists(audio_path):
+                data = asset_pack.read_bytes(audio_path)
+            return MusicSource(audio_path, track, data)
+        track = self.get(video_path)
+        return MusicSource(video_path, track) if track is not None else None
+
+    def get(self, audio_path):
+        """返回解码后的 PCMTrack，没有时在当前线程解码（其他线程正在解码时等待它完成）。
+        文件不存在、mixer 未初始化或格式无法解码时返回 None，调用方改为直接播放原文件"""
+        while True:
+            with self._lock:
+                if audio_path in self.failed:
+                    return None
+                track = self.memory.get(audio_path)
+                if track is not None:
+                    self.memory.move_to_end(audio_path)
+                    return track
+                track = self.files.get(audio_path)
+                if track is not None:
+                    return track
+                loading = self._loading.get(audio_path)
+                if loading is None:
+                    loading = self._loading[audio_path] = threading.Event()
+                    break
+            loading.wait()
+            with self._lock:
+                if audio_path not in self.memory and audio_path not in self.files:
+                    return None  # 解码失败
+
+        track = None
+        try:
+            track = self._load(audio_path)
+            if track is not None:
+                self._keep(audio_path, track)
+            return track
+        finally:
+            with self._lock:
+                if track is None:
+                    self.failed.add(audio_path)
+                self._loading.pop(audio_path).set()
+
+    def _load(self, audio_path):
+        mixer_format = pygame.mixer.get_init()
+        if not mixer_format or mixer_format[1] not in FFMPEG_FORMATS or not asset_pack.exists(audio_path):
+            return None
+        rate, size, channels = mixer_format
+        bits = abs(size)
+        wav_path = os.path.join(self.directory, self.key(audio_path, mixer_format) + ".wav")
+        if os.path.isfile(wav_path):
+            return PCMTrack(rate, channels, bits, os.path.getsize(wav_path) - WAV_HEADER_SIZE, path=wav_path)
+
+        if os.path.splitext(audio_path)[1].lower() in CONTAINER_EXTENSIONS:
+            # 视频文件中的音轨：由 ffmpeg 子进程解码，不占用本进程的 GIL
+            data = decode_container(audio_path, rate, channels, size)
+            if data is None:
+                return None
+        else:
+            # pygame.mixer.Sound 解码并转换为 mixer 的输出格式（解码期间释放 GIL，不阻塞渲染线程）
+            try:
+                data = pygame.mixer.Sound(asset_pack.source(audio_path)).get_raw()
+            except pygame.error as e:
+                print(f"无法解码音频文件 {audio_path}: {e}")
+                return None
+
+        # 写入缓存文件（先写临时文件再改名，中断时不会留下不完整的缓存）
+        tmp_path = wav_path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(wav_header(len(data), rate, channels, bits))
+                f.write(data)
+            os.replace(tmp_path, wav_path)
+        except OSError as e:
+            print(f"无法保存音频缓存: {e}")
+            wav_path = None
+        return PCMTrack(rate, channels, bits, len(data), data=data, path=wav_path)
+
+    def _keep(self, audio_path, track):
+        """内存中的音频超出上限时，淘汰最久未使用的（有缓存文件的改为从文件播放）"""
+        with self._lock:
+            if track.data is None:
+                self.files[audio_path] = track
+                return
+            self.memory[audio_path] = track
+            self.used += track.length
+            while self.used > self.max_bytes and self.memory:
+                path, evicted = self.memory.popitem(last=False)
+                self.used -= evicted.length
+                if evicted.path is not None:
+                    self.files[path] = PCMTrack(evicted.rate, evicted.channels, evicted.bits, evicted.length,
+                                                path=evicted.path)
+
+
+def main(paths):
+    pygame.mixer.init()
+    cache = AudioCache(0)
+    for path in paths or sorted(glob.glob(os.path.join("res", "*.mp3")) + glob.glob(os.path.join("res", "*.mp4"))):
+        track = cache.get(path)
+        if track is not None:
+            print(f"{path}: {track.duration:.1f} 秒，{track.length / 1024 ** 2:.1f} MB -> {track.path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
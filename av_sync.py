@@ -0,0 +1,211 @@
+import io
+import os
+import time
+
+import pygame
+
+
+def precise_sleep(seconds):
+    """精确等待：先粗略 sleep，最后几毫秒忙等，避免系统调度误差"""
+    deadline = time.perf_counter() + seconds
+    if seconds > 0.002:
+        time.sleep(seconds - 0.002)
+    while time.perf_counter() < deadline:
+        pass
+
+
+def play_music(start=0.0):
+    """从 start 秒开始播放已加载的音乐。音频格式不支持定位时不播放并返回 False，画面改用墙上时钟"""
+    try:
+        pygame.mixer.music.play(start=start)
+    except pygame.error as e:
+        if not start:
+            raise
+        print(f"音频无法从 {start:.2f} 秒开始播放: {e}")
+        return False
+    return True
+
+
+def pause_music():
+    """暂停音乐（触发点、快进）。PCM 流由 Python 对象提供，mixer.music.pause/unpause 持有 GIL 等待音频锁，
+    而音频线程读取流时需要 GIL，二者会互相等待卡死；因此直接停止播放，继续时由 resync 从画面的位置重新播放"""
+    pygame.mixer.music.stop()
+
+
+class MusicSource:
+    """一个片段的音频。已解码为 PCM（track）时每次播放都从内存或缓存文件按采样精确定位，没有解码延迟，
+    也不依赖音频格式是否支持定位；否则交给 mixer.music 直接解码原文件（data 为读入内存的文件内容）"""
+
+    def __init__(self, path, track=None, data=None):
+        self.path = path
+        self.track = track
+        self.data = data
+
+    def play_from(self, start=0.0):
+        """从 start 秒开始播放，返回是否成功；失败时画面改用墙上时钟"""
+        try:
+            if self.track is not None:
+                pygame.mixer.music.load(self.track.stream(start), "wav")
+                pygame.mixer.music.play()
+                return True
+            source = io.BytesIO(self.data) if self.data is not None else self.path
+            pygame.mixer.music.load(source, os.path.splitext(self.path)[1][1:])
+            return play_music(start)
+        except pygame.error as e:
+            print(f"无法播放音频文件: {e}")
+            return False
+
+
+class PlaybackClock:
+    """播放主时钟：有音频时以 pygame.mixer.music.get_pos() 为准（两次更新之间用高精度计时插值），
+    没有音频或音频先结束时使用扣除暂停时间的墙上时钟"""
+
+    def __init__(self, use_audio, offset=0.0):
+        self.use_audio = use_audio
+        self.offset = offset  # 从视频中间开始播放时的起始位置（秒），音频也从该位置开始
+        self._start = time.perf_counter()
+        self._paused_at = None
+        self._paused_total = 0.0
+        self._audio_pos = None
+        self._audio_stamp = 0.0
+        self._last = 0.0
+        self.start_latency = None  # 从开始播放到音频实际输出的延迟（秒），get_pos 第一次前进时测得
+
+    def pause(self):
+        if self._paused_at is None:
+            self._paused_at = time.perf_counter()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._paused_total += time.perf_counter() - self._paused_at
+            self._paused_at = None
+            self._audio_pos = None
+
+    def _wall(self):
+        now = self._paused_at if self._paused_at is not None else time.perf_counter()
+        return self.offset + now - self._start - self._paused_total
+
+    def now(self):
+        """当前播放位置（秒）"""
+        if self.use_audio:
+            pos = pygame.mixer.music.get_pos()
+            if pos >= 0:
+                stamp = time.perf_counter()
+                if pos != self._audio_pos:
+                    self._audio_pos = pos
+                    self._audio_stamp = stamp
+                    if self.start_latency is None and pos > 0:
+                        self.start_latency = max(0.0, stamp - self._start - self._paused_total - pos / 1000)
+                # get_pos 按音频缓冲区粒度更新，中间用高精度计时插值
+                elapsed = 0.0 if self._paused_at is not None else min(stamp - self._audio_stamp, 0.1)
+                self._last = self.offset + pos / 1000 + elapsed
+                return self._last
+            # 音频已结束：从最后的位置起改用墙上时钟继续计时
+            self.use_audio = False
+            now = time.perf_counter()
+            self._start = now - (self._last - self.offset)
+            self._paused_total = 0.0
+            if self._paused_at is not None:
+                self._paused_at = now
+        return self._wall()
+
+
+class AVSync:
+    """以音频为主时钟的音画同步：视频超前时精确等待，落后时丢帧（由解码线程只 grab 不解码地跳过）"""
+
+    def __init__(self, fps, clock):
+        self.fps = fps
+        self.frame_duration = 1 / fps
+        self.clock = clock
+        self.drift = 0.0  # 视频相对主时钟的偏移（秒），正数表示视频超前
+        self.max_drift = 0.0  # 播放过程中落后最多的偏移
+        self.dropped_frames = 0  # 已解码但未显示而丢弃的帧数
+        self.presented_frames = 0
+        self.max_wait = 0.5
+        self.waited = 0.0  # 最近一帧等待显示时刻的秒数（不计入每帧耗时）
+
+    def target_frame(self):
+        """按主时钟当前应显示的帧号"""
+        return int(self.clock.now() * self.fps)
+
+    def schedule(self, frame_index, droppable=True):
+        """决定帧 frame_index 是否显示：超前时等到显示时间再返回 True，落后超过一帧时返回 False（丢弃）"""
+        self.drift = frame_index * self.frame_duration - self.clock.now()
+        if self.drift < self.max_drift:
+            self.max_drift = self.drift
+        self.waited = 0.0
+        if self.drift < -self.frame_duration and droppable:
+            self.dropped_frames += 1
+            return False
+        if self.drift > 0:
+            # 单次等待不超过 max_wait，主时钟异常停滞时画面也不会卡死
+            start = time.perf_counter()
+            precise_sleep(min(self.drift, self.max_wait))
+            self.waited = time.perf_counter() - start
+        self.presented_frames += 1
+        return True
+
+    def pause(self):
+        self.clock.pause()
+
+    def resume(self):
+        self.clock.resume()
+
+
+FAST_FORWARD_STEP = 8  # 快进时每 8 帧解码显示一帧，按原帧率显示即约 8 倍速
+
+
+def resync(fps, frame_index, music):
+    """从第 frame_index 帧恢复正常播放（快进结束后）：音频（MusicSource，没有音频时为 None）定位到该帧的位置重新播放，
+    返回新的 AVSync"""
+    position = frame_index / fps
+    use_audio = music is not None and music.play_from(position)
+    return AVSync(fps, PlaybackClock(use_audio=use_audio, offset=position))
+
+
+class FastForward:
+    """快进状态（所有章节共用）：解码线程每 step 帧只解码一帧，其余只 grab（不解码转换），画面按原帧率显示；
+    快进期间音频停止，结束后音频定位到当前画面继续。快进跨片段保持，遇到触发点或选择时停止"""
+
+    def __init__(self, step=FAST_FORWARD_STEP):
+        self.step = step
+        self.active = False  # 正在快进
+        self.draining = False  # 已结束快进，正在显示队列中快进时解码的帧
+        self.last_index = 0
+        self._next = 0.0
+
+    def start(self, decoder, limit=None, step=None):
+        """对 decoder 开始（或在新片段继续）快进，limit 为下一个触发点的帧号，快进不越过它。
+        step 默认为 self.step，大于到 limit 的距离时直接 grab 到 limit"""
+        self.active = True
+        self.draining = False
+        decoder.fast_forward(step or self.step, limit)
+        pause_music()
+        self._next = time.perf_counter()
+
+    def stop(self, decoder, frame_index, drain=True):
+        """结束快进，frame_index 为当前显示的帧。drain 为 False 时队列中没有快进的帧（停在触发点），调用方立即 resync"""
+        self.active = False
+        self.draining = drain
+        self.last_index = frame_index
+        decoder.fast_forward(1)
+
+    def cancel(self):
+        """遇到选择等交互时停止快进（此时没有正在播放的视频）"""
+        self.active = False
+        self.draining = False
+
+    def pace(self, frame_index, fps):
+        """快进中按原帧率显示 frame_index 并返回 True。结束快进后队列中快进的帧显示完毕、
+        回到逐帧解码时返回 False，调用方应从 frame_index 调用 resync"""
+        if not self.active and frame_index == self.last_index + 1:
+            self.draining = False
+            return False
+        self.last_index = frame_index
+        self._next += 1 / fps
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            precise_sleep(delay)
+        else:
+            self._next = time.perf_counter()
+        return True
@@ -0,0 +1,305 @@
+"""无界面播放基准测试：用 cv2.VideoWriter 在本地生成合成视频，在 SDL dummy 驱动下
+分别通过第一章的 play_video_frame_func 和第二、三章的 play_video_and_audio 播放，
+自动完成滑动和点击提示，统计每种屏幕尺寸下的持续帧率、每帧耗时分位数和峰值内存，结果保存为 JSON。
+
+用法：
+    python bench.py                                # 默认不限速，测量最大吞吐
+    python bench.py --paced                        # 按音频时钟正常播放，测量丢帧和偏移
+    python bench.py --screens 1280x720,1920x1080 --clips 640x360x3,1920x1080x10
+    python bench.py --compare cache/bench/上次结果.json [--max-regression 0.1]
+
+每个用例在单独的子进程中运行，峰值内存互不影响。不需要 res/ 中的素材。
+比较时任一用例的帧率下降超过 --max-regression（比例）即返回非零退出码，可用于持续集成。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PATHS = ("frame_func", "video_and_audio")
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_clip(text):
+    """宽x高x秒数，例如 1280x720x10"""
+    width, height, seconds = text.lower().split("x")
+    return int(width), int(height), float(seconds)
+
+
+def make_clip(path, width, height, seconds, fps=30):
+    """生成带移动渐变和噪点的合成视频，保证编码后的帧有真实的解码负担"""
+    import cv2
+    import numpy as np
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"无法创建视频文件: {path}")
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    rng = np.random.default_rng(0)
+    for i in range(int(seconds * fps)):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (x + i * 4) % 256
+        frame[..., 1] = (y + i * 2) % 256
+        frame[..., 2] = rng.integers(0, 64, (height, width), dtype=np.uint8) + 96
+        writer.write(frame)
+    writer.release()
+
+
+def make_silence(path, seconds, rate=22050):
+    """生成静音 WAV，让第二、三章的播放路径使用音频主时钟"""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"\0\0" * int(rate * seconds))
+
+
+def prepare_assets(directory, clips):
+    """在临时目录中准备 story.json、res/（替代字体、占位音频）和合成视频，返回 [(视频路径, 音频路径, 宽, 高, 秒数)]"""
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame.font
+
+    res = os.path.join(directory, "res")
+    os.makedirs(res, exist_ok=True)
+    # 用 pygame 自带字体代替 simhei.ttf；第一章只检查音频文件存在
+    default_font = os.path.join(os.path.dirname(pygame.font.__file__), pygame.font.get_default_font())
+    shutil.copy(default_font, os.path.join(res, "simhei.ttf"))
+    make_silence(os.path.join(res, "chapter_one.mp3"), 0.1)
+    shutil.copy(os.path.join(HERE, "story.json"), directory)
+    prepared = []
+    for width, height, seconds in clips:
+        video_path = os.path.join(res, f"synthetic_{width}x{height}_{seconds:g}s.mp4")
+        audio_path = os.path.join(res, f"synthetic_{seconds:g}s.wav")
+        if not os.path.exists(video_path):
+            make_clip(video_path, width, height, seconds)
+        if not os.path.exists(audio_path):
+            make_silence(audio_path, seconds)
+        prepared.append((video_path, audio_path, width, height, seconds))
+    return prepared
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    """本进程的峰值常驻内存（MB），无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 ** 2
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(path, video_path, audio_path, screen_width, screen_height, paced):
+    """在当前进程中播放一次，返回统计结果"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    import pygame
+    import av_sync
+    from runtime import Runtime
+
+    if not paced:
+        # 不限速：帧超前时不等待，测量解码和绘制的最大吞吐（固定原画质，不启用自适应画质）
+        av_sync.precise_sleep = lambda seconds: None
+        os.environ["QUALITY_GOVERNOR"] = "0"
+
+    runtime = Runtime(screen_width, screen_height)
+
+    # 记录每次刷新屏幕的时刻
+    present_times = []
+    update = pygame.display.update
+
+    def timed_update(*args):
+        update(*args)
+        present_times.append(time.perf_counter())
+
+    pygame.display.update = timed_update
+    prompts = []
+    start = time.perf_counter()
+
+    if path == "frame_func":
+        import main
+
+        game = main.Game(runtime)
+        if not game.play_video_init(video_path):
+            raise RuntimeError(f"无法打开视频文件: {video_path}")
+        game.av_sync = av_sync.AVSync(game.fps, av_sync.PlaybackClock(use_audio=False))
+        while game.play_video_frame_func():
+            # 自动完成滑动提示
+            prompts.extend(game.triggers.due(game.current_frame))
+        sync = game.av_sync
+    else:
+        import main2
+
+        game = main2.Game(runtime=runtime)
+        # 自动完成滑动和点击提示
+        game.wait_for_swipe = lambda direction, message: prompts.append(direction)
+        game.wait_for_click = lambda message: prompts.append(message)
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / (cap.get(cv2.CAP_PROP_FPS) or 30)
+        cap.release()
+        game.play_video_and_audio(video_path, audio_path,
+                                  swipe_scenes=[{"time": duration / 3, "direction": "right"}],
+                                  pause_scenes=[{"time": duration * 2 / 3, "message": "bench"}])
+        sync = game.av_sync
+
+    elapsed = time.perf_counter() - start
+    governor = runtime.governor
+    pygame.display.update = update
+    intervals = sorted(round((b - a) * 1000, 3) for a, b in zip(present_times, present_times[1:]))
+    pygame.quit()
+    return {
+        "frames": len(present_times),
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(len(present_times) / elapsed, 2) if elapsed > 0 else None,
+        "frame_ms": {
+            "p50": percentile(intervals, 0.5),
+            "p95": percentile(intervals, 0.95),
+            "p99": percentile(intervals, 0.99),
+            "max": intervals[-1] if intervals else None,
+        },
+        "dropped_frames": sync.dropped_frames if sync else None,
+        "max_drift_ms": round(sync.max_drift * 1000, 2) if sync else None,
+        "audio_start_ms": round(sync.clock.start_latency * 1000, 2)
+        if sync and sync.clock.start_latency is not None else None,
+        "quality_level": max([level for _, level, _ in governor.changes], default=0) if governor else None,
+        "quality_changes": len(governor.changes) if governor else None,
+        "prompts": len(prompts),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_case_subprocess(asset_dir, path, clip, screen, paced):
+    video_path, audio_path, width, height, seconds = clip
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1",
+               PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.pop("FRAME_CACHE_MAX_GB", None)  # 测量的是解码路径，不使用帧缓存
+    command = [sys.executable, os.path.join(HERE, "bench.py"), "--case", path, video_path, audio_path,
+               f"{screen[0]}x{screen[1]}"]
+    if paced:
+        command.append("--paced")
+    result = subprocess.run(command, cwd=asset_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, timeout=600)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("{"):
+            stats = json.loads(line)
+            break
+    else:
+        raise RuntimeError(f"用例 {path} {width}x{height} 失败（退出码 {result.returncode}）:\n{result.stderr[-2000:]}")
+    return dict({"path": path, "clip": f"{width}x{height}", "clip_seconds": seconds,
+                 "screen": f"{screen[0]}x{screen[1]}"}, **stats)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(previous, current, max_regression):
+    """与之前的结果比较每个用例的帧率，返回帧率下降比例超过 max_regression 的用例数"""
+    old = {(c["path"], c["clip"], c["clip_seconds"], c["screen"]): c for c in previous["cases"]}
+    print(f"\n与 {previous.get('commit')} 比较:")
+    if previous.get("paced") != current["paced"]:
+        print("  注意：两次结果的限速模式不同，帧率不可直接比较")
+    regressions = 0
+    for case in current["cases"]:
+        before = old.get((case["path"], case["clip"], case["clip_seconds"], case["screen"]))
+        if before and before["fps"] and case["fps"]:
+            change = (case["fps"] - before["fps"]) / before["fps"] * 100
+            print(f"  {case['path']:<16} {case['clip']:>10} -> {case['screen']:<10} "
+                  f"{before['fps']:>8.1f} -> {case['fps']:>8.1f} fps ({change:+.1f}%)"
+                  + ("  <- 性能退化" if -change > max_regression * 100 else ""))
+            if -change > max_regression * 100:
+                regressions += 1
+    if regressions:
+        print(f"{regressions} 个用例的帧率下降超过 {max_regression * 100:.0f}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面播放基准测试")
+    parser.add_argument("--screens", default="1280x720,1920x1080", help="屏幕尺寸列表，逗号分隔")
+    parser.add_argument("--clips", default="640x360x3,1280x720x3,1920x1080x3", help="合成视频 宽x高x秒数，逗号分隔")
+    parser.add_argument("--paths", default=",".join(PATHS), help="播放路径: frame_func（第一章）, video_and_audio（第二、三章）")
+    parser.add_argument("--paced", action="store_true", help="按音频时钟正常播放（默认不限速）")
+    parser.add_argument("--assets", help="合成素材目录（默认使用临时目录，指定后可重复使用）")
+    parser.add_argument("--output", help="结果 JSON 路径（默认 cache/bench/bench-<时间>.json）")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 比较")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="比较时允许的帧率下降比例，超过时返回非零退出码（默认 0.1）")
+    parser.add_argument("--case", nargs=4, metavar=("PATH", "VIDEO", "AUDIO", "SCREEN"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        path, video_path, audio_path, screen = args.case
+        print(json.dumps(run_case(path, video_path, audio_path, *parse_size(screen), args.paced)))
+        return 0
+
+    screens = [parse_size(s) for s in args.screens.split(",")]
+    clips = [parse_clip(c) for c in args.clips.split(",")]
+    paths = args.paths.split(",")
+    asset_dir = args.assets or tempfile.mkdtemp(prefix="bench-")
+    try:
+        prepared = prepare_assets(asset_dir, clips)
+        results = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "paced": args.paced,
+            "cases": [],
+        }
+        for screen in screens:
+            for clip in prepared:
+                for path in paths:
+                    case = run_case_subprocess(asset_dir, path, clip, screen, args.paced)
+                    results["cases"].append(case)
+                    print(f"{path:<16} {case['clip']:>10} -> {case['screen']:<10} {case['fps']:>8.1f} fps  "
+                          f"p50 {case['frame_ms']['p50']:.2f} ms  p99 {case['frame_ms']['p99']:.2f} ms  "
+                          f"丢帧 {case['dropped_frames']}  峰值内存 {case['peak_rss_mb'] or 0:.0f} MB")
+    finally:
+        if not args.assets:
+            shutil.rmtree(asset_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(HERE, "cache", "bench", f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if compare(json.load(f), results, args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+import time
+
+
+def save_root():
+    """存档目录：开发时位于项目目录，打包后位于可执行文件旁（与缓存目录分开，清理缓存不会丢失进度）"""
+    if getattr(sys, "frozen", False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, "save")
+
+
+class CheckpointStore:
+    """剧情进度存档：每个视频片段、选择和触发点之后保存当前章节、节点、帧号、已做的选择和已看过的片段，
+    程序崩溃或重启后可用 main.py --resume 从该位置继续"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(save_root(), "checkpoint.json")
+        self.state = {"chapter": None, "node": None, "frame": 0, "choices": [], "seen": []}
+
+    def load(self):
+        """读取存档，返回可以继续的进度；故事已结束、没有存档或存档损坏时返回 None"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict):
+            return None
+        self.state.update(state)
+        return self.state if self.state.get("chapter") else None
+
+    def save(self, chapter, node=None, frame=0, choice=None, seen=None):
+        """保存当前位置：node 为剧情节点名（None 表示章节起点），frame 为该节点视频中的帧号。
+        choice 为刚做出的选择，seen 为刚播放完的视频"""
+        self.state["chapter"] = chapter
+        self.state["node"] = node
+        self.state["frame"] = int(frame)
+        if choice is not None:
+            self.state["choices"].append(choice)
+        if seen is not None and seen not in self.state["seen"]:
+            self.state["seen"].append(seen)
+        self.state["saved_at"] = time.time()
+        self._write()
+
+    def clear(self):
+        """故事结束：清除进度，下次从标题画面开始（已看过的片段仍然保留）"""
+        self.state.update(chapter=None, node=None, frame=0, choices=[])
+        self._write()
+
+    def _write(self):
+        # 先写临时文件再替换，写入过程中断电也不会留下损坏的存档
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"无法保存进度: {e}")
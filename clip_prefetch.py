@@ -0,0 +1,172 @@
+import threading
+
+import cv2
+
+from asset_pack import open_video
+from av_sync import MusicSource
+from video_decoder import FrameDecoder
+
+
+class PreparedClip:
+    """一个已预先打开的视频片段：VideoCapture、已预解码若干帧的解码线程以及已解码为 PCM 的音频"""
+
+    def __init__(self, video_path, audio_path, screen_width, screen_height, queue_size, prefetch_limit=None,
+                 frame_cache=None, profiler=None, start_frame=0, keyframes=None, parallel=None, audio_cache=None,
+                 manifest=None):
+        self.video_path = video_path
+        self.audio_path = audio_path
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.queue_size = queue_size
+        self.prefetch_limit = prefetch_limit
+        self.frame_cache = frame_cache
+        self.profiler = profiler
+        self.start_frame = start_frame  # 从第几帧开始播放（继续游戏、跳转场景）
+        self.keyframes = keyframes  # 关键帧索引，start_frame 不为 0 时用于快速定位
+        self.parallel = parallel  # 可选的多进程分段解码（高分辨率视频）
+        self.audio_cache = audio_cache  # 音频解码缓存，没有时直接播放音频文件
+        self.manifest = manifest  # 资源清单，收录的视频不再探测帧率和帧数，并按屏幕选用分辨率版本
+        self.decode_path = video_path  # 实际解码的文件（原视频或与屏幕匹配的分辨率版本）
+        self.cap = None
+        self.decoder = None
+        self.fps = 30
+        self.frame_count = 0
+        self.music = None  # 音频（MusicSource），没有音频时为 None
+        self.opened = False
+        self._thread = None
+
+    def open(self):
+        """打开视频并启动解码线程，同时把音频（没有 audio_path 时为视频文件中的音轨）解码为 PCM"""
+        if self.manifest is not None:
+            self.decode_path = self.manifest.variant(self.video_path, self.screen_width, self.screen_height)
+        # 有有效的帧缓存时直接从内存映射读取已缩放的帧
+        if self.frame_cache is not None:
+            self.cap = self.frame_cache.open(self.decode_path, self.screen_width, self.screen_height)
+        if self.cap is None:
+            self.cap = open_video(self.decode_path)
+        if not self.cap.isOpened():
+            self.cap.release()
+            return self
+
+        # 获取视频帧率和帧数（资源清单中已有时直接使用）
+        entry = self.manifest.get(self.video_path) if self.manifest is not None else None
+        if entry is not None:
+            self.fps = entry["fps"]
+            self.frame_count = entry["frames"]
+        else:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self.frame_count = self.cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        if self.fps == 0:
+            self.fps = 30  # 默认帧率
+        if self.parallel is not None and isinstance(self.cap, cv2.VideoCapture):
+            # 高分辨率视频由进程池分段并行解码，本进程的 VideoCapture 只用于读取视频信息
+            self.decoder = self.parallel.open(self.cap, self.decode_path, self.keyframes, self.screen_width,
+                                              self.screen_height, self.start_frame, self.prefetch_limit)
+        if self.decoder is not None:
+            self.decoder.start()
+        else:
+            self._start_decoder()
+
+        if self.audio_cache is not None:
+            self.music = self.audio_cache.music(self.video_path, self.audio_path)
+        elif self.audio_path:
+            self.music = MusicSource(self.audio_path)
+        self.opened = True
+        return self
+
+    def _start_decoder(self):
+        """在本进程的后台线程中解码：定位到开始的帧，从头播放时顺便写入帧缓存"""
+        recorder = None
+        start_index = 0
+        if self.start_frame > 0 and self.keyframes is not None:
+            start_index = self.keyframes.seek(self.cap, self.decode_path, self.start_frame)
+        if self.frame_cache is not None and isinstance(self.cap, cv2.VideoCapture) and start_index == 0:
+            recorder = self.frame_cache.writer(self.decode_path, self.screen_width, self.screen_height,
+                                               self.fps, self.frame_count)
+        self.decoder = FrameDecoder(self.cap, self.screen_width, self.screen_height,
+                                    self.queue_size, self.prefetch_limit, recorder, self.profiler,
+                                    start_index).start()
+
+    def open_async(self):
+        """在后台线程中打开，不阻塞当前播放"""
+        self._thread = threading.Thread(target=self.open, name="ClipPrefetch", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self):
+        """等待后台打开完成"""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def release(self):
+        """停止解码并释放资源"""
+        self.wait()
+        if self.decoder is not None:
+            self.decoder.stop()
+            self.decoder = None
+        elif self.cap is not None:
+            self.cap.release()
+        self.cap = None
+        self.music = None
+
+
+class ClipPrefetcher:
+    """分支感知的视频预取：当前片段播放时预先打开所有可能的后继片段（包括选项后的各个分支），
+    并预解码前若干帧；做出选择后丢弃未选中的分支"""
+
+    def __init__(self, screen_width, screen_height, queue_size=8, prefetch_frames=4, frame_cache=None, profiler=None,
+                 keyframes=None, parallel=None, audio_cache=None, manifest=None):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.queue_size = queue_size
+        self.prefetch_frames = prefetch_frames  # 每个后继片段预解码的帧数
+        self.frame_cache = frame_cache  # 可选的磁盘帧缓存
+        self.profiler = profiler  # 可选的分阶段计时
+        self.keyframes = keyframes  # 关键帧索引（从中间开始播放、并行分段解码时使用）
+        self.parallel = parallel  # 可选的多进程分段解码
+        self.audio_cache = audio_cache  # 音频解码缓存（后继片段的音频在预取时解码）
+        self.manifest = manifest  # 资源清单
+        self.prepared = {}  # video_path -> PreparedClip
+
+    def prefetch(self, clips):
+        """预取后继片段 clips=[(video_path, audio_path), ...]，不在列表中的已预取片段会被丢弃"""
+        wanted = dict(clips)
+        for video_path in list(self.prepared):
+            if video_path not in wanted:
+                self.prepared.pop(video_path).release()
+        for video_path, audio_path in wanted.items():
+            if video_path not in self.prepared:
+                self.prepared[video_path] = PreparedClip(
+                    video_path, audio_path, self.screen_width, self.screen_height,
+                    self.queue_size, self.prefetch_frames, self.frame_cache, self.profiler,
+                    keyframes=self.keyframes, parallel=self.parallel, audio_cache=self.audio_cache,
+                    manifest=self.manifest).open_async()
+
+    def take(self, video_path, audio_path=None, start_frame=0):
+        """取出已预取的片段；未预取或需要从第 start_frame 帧开始时同步打开"""
+        clip = self.prepared.pop(video_path, None)
+        if clip is not None:
+            if start_frame == 0:
+                clip.wait()
+                if clip.decoder is not None:
+                    clip.decoder.release_limit()  # 即将播放，解除预取限制
+                return clip
+            clip.release()
+        return PreparedClip(video_path, audio_path, self.screen_width, self.screen_height, self.queue_size,
+                            frame_cache=self.frame_cache, profiler=self.profiler, start_frame=start_frame,
+                            keyframes=self.keyframes, parallel=self.parallel, audio_cache=self.audio_cache,
+                            manifest=self.manifest).open()
+
+    def resize_screen(self, screen_width, screen_height):
+        """窗口尺寸变化后已预取的帧尺寸失效，全部丢弃"""
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.clear()
+
+    def clear(self):
+        """丢弃所有预取片段"""
+        for clip in self.prepared.values():
+            clip.release()
+        self.prepared = {}
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import cv2
+import numpy as np
+
+import asset_pack
+
+
+def cache_root():
+    """缓存目录：开发时位于项目目录，打包后位于可执行文件旁（sys._MEIPASS 每次启动都会重新解压，不能存放缓存）"""
+    if getattr(sys, "frozen", False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, "cache")
+
+
+class CachedCapture:
+    """从缓存文件（内存映射）读取已缩放好的帧，接口与 cv2.VideoCapture 的常用部分一致"""
+
+    random_access = True  # 可直接定位到任意帧
+
+    def __init__(self, frames_path, meta):
+        self.frames = np.load(frames_path, mmap_mode="r")
+        self.fps = meta["fps"]
+        self.frame_count = meta["frames"]
+        self.position = 0
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frame_count
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.frames.shape[2]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.frames.shape[1]
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        return 0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = max(0, min(int(value), self.frame_count))
+            return True
+        return False
+
+    def grab(self):
+        if self.position >= self.frame_count:
+            return False
+        self.position += 1
+        return True
+
+    def read(self, image=None):
+        if self.position >= self.frame_count:
+            return False, None
+        frame = self.frames[self.position]
+        self.position += 1
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, np.array(frame)
+
+    def release(self):
+        self.frames = None
+
+
+class FrameCacheWriter:
+    """首次完整播放时把缩放后的帧写入临时缓存文件，播放完整结束后才正式生效"""
+
+    def __init__(self, cache, key, video_path, fps, frame_count, screen_size=None):
+        self.cache = cache
+        self.key = key
+        self.video_path = video_path
+        self.screen_size = screen_size  # 缓存对应的屏幕尺寸（缓存按它区分）
+        self.fps = fps
+        self.frame_count = int(frame_count)
+        self.frames = None
+        self.written = 0
+        self.tmp_path = cache.frames_path(key) + ".tmp"
+        self.aborted = self.frame_count <= 0
+
+    def write(self, index, frame, layout=None):
+        """写入第 index 帧，帧号不连续（发生跳帧）或帧尺寸、布局变化（窗口或内部渲染分辨率变化）时放弃本次缓存"""
+        if self.aborted:
+            return
+        if index != self.written or index >= self.frame_count:
+            self.abort()
+            return
+        if layout is not None and self.screen_size is not None and layout.screen_size != self.screen_size:
+            self.abort()
+            return
+        if self.frames is not None and frame.shape != self.frames.shape[1:]:
+            self.abort()
+            return
+        if self.frames is None:
+            height, width = frame.shape[:2]
+            size = self.frame_count * height * width * 3
+            if not self.cache.reserve(size):
+                self.abort()
+                return
+            self.frames = np.lib.format.open_memmap(self.tmp_path, mode="w+", dtype=np.uint8,
+                                                    shape=(self.frame_count, height, width, 3))
+        self.frames[index] = frame
+        self.written += 1
+
+    def finish(self):
+        """视频完整播放结束，写入元数据使缓存生效"""
+        if self.aborted or self.frames is None:
+            self.abort()
+            return
+        self.frames.flush()
+        self.frames = None
+        os.replace(self.tmp_path, self.cache.frames_path(self.key))
+        self.cache.write_meta(self.key, {"video": self.video_path, "fps": self.fps, "frames": self.written})
+        self.aborted = True
+
+    def abort(self):
+        self.aborted = True
+        self.frames = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class FrameCache:
+    """按 (视频路径, 目标分辨率, 源文件修改时间) 缓存已缩放到屏幕尺寸的帧，超过容量上限时按最近使用时间淘汰"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, directory=None):
+        """设置环境变量 FRAME_CACHE_MAX_GB 时启用帧缓存，否则返回 None"""
+        try:
+            max_gb = float(os.environ.get("FRAME_CACHE_MAX_GB", "0"))
+        except ValueError:
+            max_gb = 0
+        if max_gb <= 0:
+            return None
+        return cls(directory or os.path.join(cache_root(), "frames"), int(max_gb * 1024 ** 3))
+
+    def key(self, video_path, screen_width, screen_height):
+        mtime = asset_pack.stat(video_path)[1]
+        text = f"{os.path.abspath(video_path)}|{screen_width}x{screen_height}|{mtime}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def frames_path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def meta_path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def write_meta(self, key, meta):
+        with open(self.meta_path(key), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def open(self, video_path, screen_width, screen_height):
+        """有有效缓存时返回 CachedCapture，否则返回 None"""
+        try:
+            key = self.key(video_path, screen_width, screen_height)
+            with open(self.meta_path(key), encoding="utf-8") as f:
+                meta = json.load(f)
+            capture = CachedCapture(self.frames_path(key), meta)
+        except (OSError, ValueError):
+            return None
+        os.utime(self.frames_path(key))  # 记录最近使用时间
+        return capture
+
+    def writer(self, video_path, screen_width, screen_height, fps, frame_count):
+        """为正常解码的视频创建缓存写入器"""
+        try:
+            key = self.key(video_path, screen_width, screen_height)
+        except OSError:
+            return None
+        return FrameCacheWriter(self, key, video_path, fps, frame_count, (screen_width, screen_height))
+
+    def entries(self):
+        """所有缓存条目 [(最近使用时间, 大小, key)]"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, name[:-4]))
+        return entries
+
+    def remove(self, key):
+        for path in (self.frames_path(key), self.meta_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def reserve(self, size):
+        """为新条目腾出 size 字节：按最近使用时间从旧到新淘汰，放不下时返回 False"""
+        if size > self.max_bytes:
+            return False
+        entries = sorted(self.entries())
+        used = sum(entry[1] for entry in entries)
+        while entries and used + size > self.max_bytes:
+            _, entry_size, key = entries.pop(0)
+            self.remove(key)
+            used -= entry_size
+        return size <= shutil.disk_usage(self.directory).free
@@ -0,0 +1,206 @@
+import atexit
+import csv
+import json
+import os
+import time
+
+import numpy as np
+import pygame
+
+# 解码线程每帧的阶段：跳帧 grab、读取解码、缩放进缓冲区、写入帧缓存、等待放入队列
+DECODE_STAGES = ("grab", "read", "resize", "record", "queue")
+# 渲染循环每帧的阶段：等待队列、音画同步等待、绘制黑边、绘制帧、绘制 HUD、刷新屏幕、处理事件
+RENDER_STAGES = ("get", "sync", "letterbox", "blit", "hud", "update", "events")
+
+# 等待类阶段（队列为空或已满、音画同步超前）不代表有工作变慢，不参与“最慢阶段”的判断
+WAIT_STAGES = ("get", "sync", "queue")
+
+GRAB, READ, RESIZE, RECORD, QUEUE = range(len(DECODE_STAGES))
+GET, SYNC, LETTERBOX, BLIT, HUD, UPDATE, EVENTS = range(len(RENDER_STAGES))
+
+
+class StageRing:
+    """单个线程的分阶段计时：每帧一行，按阶段累计耗时，写入固定大小的环形缓冲区。
+    调用方式：begin() 开始一帧，每个阶段结束时 lap(阶段)，end() 提交这一帧"""
+
+    def __init__(self, name, stages, capacity=1024):
+        self.name = name
+        self.stages = stages
+        self.capacity = capacity
+        self.starts = np.zeros(capacity)  # 每帧开始时刻（perf_counter 秒）
+        self.durations = np.zeros((capacity, len(stages)))  # 每帧各阶段耗时（秒）
+        self.work_stages = [i for i, stage in enumerate(stages) if stage not in WAIT_STAGES]
+        self.count = 0  # 已提交的帧数
+        self._row = self.durations[0]
+        self._last = 0.0
+
+    def begin(self):
+        slot = self.count % self.capacity
+        self._row = self.durations[slot]
+        self._row[:] = 0
+        self._last = self.starts[slot] = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self._row[stage] += now - self._last
+        self._last = now
+
+    def skip(self):
+        """之后的耗时不计入任何阶段（例如等待玩家操作）"""
+        self._last = time.perf_counter()
+
+    def end(self):
+        self.count += 1
+
+    def recent(self, frames):
+        """最近 frames 帧的 (开始时刻, 各阶段耗时)，按时间顺序"""
+        frames = min(frames, self.count, self.capacity)
+        index = np.arange(self.count - frames, self.count) % self.capacity
+        return self.starts[index], self.durations[index]
+
+
+class FrameProfiler:
+    """播放热路径的分阶段计时（可选）：解码线程和渲染循环各自写入环形缓冲区，
+    可在画面上显示 HUD（帧率、音画偏移、队列深度、最慢阶段、画质等级），退出时导出 CSV 或 Chrome trace。
+    未启用时各处持有的是 None，热路径只多一次判断"""
+
+    def __init__(self, dump_path=None, capacity=1024, max_rings=16):
+        self.capacity = capacity
+        self.max_rings = max_rings
+        self.render = StageRing("render", RENDER_STAGES, capacity)  # 渲染循环
+        self.decoders = []  # 解码线程（包括预取的片段），只保留最近 max_rings 个
+        self.quality = []  # 自适应画质的等级变化 [(时刻, 等级)]
+        self.audio_starts = []  # 每个片段的音频启动延迟 [(时刻, 秒)]
+        self.dump_path = dump_path
+        self.hud_visible = False
+        self._hud_surface = None
+        self._hud_rect = None
+        self._hud_updated = 0.0
+        self._decoder_count = 0
+        if dump_path:
+            atexit.register(self.dump)
+
+    @classmethod
+    def from_env(cls):
+        """设置环境变量 FRAME_PROFILE 时启用：值为 .json 路径时导出 Chrome trace，其他路径导出 CSV，为 1 时只计时不导出"""
+        value = os.environ.get("FRAME_PROFILE")
+        if not value or value == "0":
+            return None
+        return cls(None if value == "1" else value)
+
+    @property
+    def rings(self):
+        return [self.render] + self.decoders
+
+    def decoder_ring(self):
+        """为一个解码线程创建计时环形缓冲区"""
+        self._decoder_count += 1
+        ring = StageRing(f"decode-{self._decoder_count}", DECODE_STAGES, self.capacity)
+        self.decoders.append(ring)
+        del self.decoders[:-self.max_rings]
+        return ring
+
+    def record_quality(self, level):
+        """记录自适应画质切换到 level 的时刻，随计时数据一起导出"""
+        self.quality.append((time.perf_counter(), level))
+
+    def record_audio_start(self, latency):
+        """记录一个片段从开始播放到音频实际输出的延迟（秒），HUD 显示最近一次，随计时数据一起导出"""
+        self.audio_starts.append((time.perf_counter(), latency))
+
+    def toggle_hud(self):
+        self.hud_visible = not self.hud_visible
+        self._hud_surface = None
+        self._hud_rect = None
+
+    def slowest_stage(self, window=1.0):
+        """最近 window 秒内平均耗时最长的非等待阶段 (线程名, 阶段名, 毫秒)"""
+        now = time.perf_counter()
+        slowest = None
+        for ring in self.rings:
+            starts, durations = ring.recent(120)
+            recent = durations[starts >= now - window]
+            if len(recent):
+                means = recent.mean(axis=0)
+                stage = max(ring.work_stages, key=lambda i: means[i])
+                if slowest is None or means[stage] * 1000 > slowest[2]:
+                    slowest = (ring.name, ring.stages[stage], float(means[stage]) * 1000)
+        return slowest
+
+    def fps(self):
+        starts, _ = self.render.recent(60)
+        if len(starts) < 2 or starts[-1] <= starts[0]:
+            return 0.0
+        return (len(starts) - 1) / (starts[-1] - starts[0])
+
+    def draw_hud(self, surface, font, drift=None, depth=None, quality=None):
+        """绘制 HUD，返回需要刷新的区域；文字每秒更新 4 次，背景区域只增大不缩小，避免残留"""
+        now = time.perf_counter()
+        if self._hud_surface is None or now - self._hud_updated >= 0.25:
+            self._hud_updated = now
+            lines = [f"fps {self.fps():.1f}"]
+            if drift is not None:
+                lines.append(f"drift {drift * 1000:+.1f} ms")
+            if depth is not None:
+                lines.append(f"queue {depth}")
+            if quality is not None:
+                lines.append(f"quality {quality}")
+            if self.audio_starts:
+                lines.append(f"audio start {self.audio_starts[-1][1] * 1000:.1f} ms")
+            slowest = self.slowest_stage()
+            if slowest:
+                lines.append(f"slowest {slowest[0]}/{slowest[1]} {slowest[2]:.2f} ms")
+            rendered = [font.render(line, True, (255, 255, 0)) for line in lines]
+            width = max(text.get_width() for text in rendered) + 12
+            height = sum(text.get_height() for text in rendered) + 12
+            rect = pygame.Rect(8, 8, width, height)
+            self._hud_rect = rect if self._hud_rect is None else self._hud_rect.union(rect)
+            self._hud_surface = pygame.Surface(self._hud_rect.size)
+            y = 6
+            for text in rendered:
+                self._hud_surface.blit(text, (6, y))
+                y += text.get_height()
+        surface.blit(self._hud_surface, self._hud_rect)
+        return self._hud_rect
+
+    def dump(self, path=None):
+        """导出所有计时数据：.json 为 Chrome trace（chrome://tracing 或 Perfetto 打开），其他扩展名为 CSV"""
+        path = path or self.dump_path
+        if not path:
+            return
+        if path.lower().endswith(".json"):
+            events = []
+            for tid, ring in enumerate(self.rings):
+                starts, durations = ring.recent(ring.capacity)
+                for start, row in zip(starts, durations):
+                    ts = start * 1e6
+                    for name, duration in zip(ring.stages, row):
+                        if duration > 0:
+                            events.append({"name": name, "ph": "X", "ts": round(ts, 1), "dur": round(duration * 1e6, 1),
+                                           "pid": 1, "tid": tid})
+                        ts += duration * 1e6
+                events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": ring.name}})
+            for start, level in self.quality:
+                events.append({"name": "quality", "ph": "C", "ts": round(start * 1e6, 1), "pid": 1,
+                               "args": {"level": level}})
+            for start, latency in self.audio_starts:
+                events.append({"name": "audio_start", "ph": "C", "ts": round(start * 1e6, 1), "pid": 1,
+                               "args": {"ms": round(latency * 1000, 2)}})
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events}, f)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["thread", "start_ms", "stage", "duration_ms"])
+                for ring in self.rings:
+                    starts, durations = ring.recent(ring.capacity)
+                    for start, row in zip(starts, durations):
+                        for name, duration in zip(ring.stages, row):
+                            writer.writerow([ring.name, f"{start * 1000:.3f}", name, f"{duration * 1000:.3f}"])
+                # 画质等级变化：阶段列为切换后的等级
+                for start, level in self.quality:
+                    writer.writerow(["quality", f"{start * 1000:.3f}", f"level {level}", "0.000"])
+                # 音频启动延迟：耗时列为延迟
+                for start, latency in self.audio_starts:
+                    writer.writerow(["audio", f"{start * 1000:.3f}", "audio_start", f"{latency * 1000:.3f}"])
+        print(f"帧计时数据已保存到 {path}")
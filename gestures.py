@@ -0,0 +1,112 @@
+import numpy as np
+import pygame
+
+
+class Gesture:
+    """滑动方向定义：从按下到松开的位移在 x、y 两个轴上的范围（屏幕坐标，y 向下为正）和最长滑动时间（毫秒）。
+    范围为 (下限, 上限) 的开区间，None 表示该侧不限"""
+
+    def __init__(self, dx=(None, None), dy=(None, None), max_duration=1000):
+        self.dx = dx
+        self.dy = dy
+        self.max_duration = max_duration
+
+
+MIN_DISTANCE = 100  # 沿滑动方向的最小距离
+MAX_DRIFT = 50  # 垂直于滑动方向允许的偏移
+
+_positive = (MIN_DISTANCE, None)
+_negative = (None, -MIN_DISTANCE)
+_straight = (-MAX_DRIFT, MAX_DRIFT)
+
+# 第二、三章共用的滑动方向表；剧情中的动作名（如 left_hand、right_finger）直接映射到对应方向，
+# 判定范围与拆分前各章节 detect_swipe 的条件一致
+GESTURES = {
+    "right": Gesture(_positive, _straight),
+    "left": Gesture(_negative, _straight),
+    "up": Gesture(_straight, _negative),
+    "down": Gesture(_straight, _positive),
+    "left_down": Gesture(_negative, _positive),
+    "left_hand": Gesture(_negative, _straight),
+    "left_hug": Gesture(_negative, _straight),
+    "right_finger": Gesture(_positive, _straight),
+}
+
+# 第一章原来允许的垂直偏移与最小距离相同，并且只有向右、向右上两种滑动
+CHAPTER_ONE_GESTURES = {
+    "right": Gesture(_positive, (-MIN_DISTANCE, MIN_DISTANCE)),
+    "right_up": Gesture(_positive, _negative),
+}
+
+
+def _within(value, bounds, scale):
+    low, high = bounds
+    return (low is None or value > low * scale) and (high is None or value < high * scale)
+
+
+class GestureTracker:
+    """滑动识别：按下鼠标开始记录，松开时按方向表判断。采样点存放在固定大小的 numpy 环形缓冲区中，
+    与上一个采样点距离过近的移动事件直接丢弃，高频的鼠标和触摸输入不会让缓冲区无限增长。
+    触摸屏输入由 SDL 转换为鼠标事件后同样在这里处理"""
+
+    def __init__(self, capacity=256, min_step=4, gestures=GESTURES):
+        self.capacity = capacity
+        self.min_step = min_step
+        self.gestures = gestures
+        self.samples = np.zeros((capacity, 3), dtype=np.float64)  # 每行 (x, y, 毫秒)
+        self.origin = np.zeros(3, dtype=np.float64)  # 按下时的采样点，缓冲区写满后仍保留
+        self.total = 0  # 本次滑动累计记录的采样点数（环形缓冲区只保留最后 capacity 个）
+        self.stroke = 0  # 滑动序号，每次按下加一，用于让轨迹绘制发现新的滑动
+        self.active = False
+        self.scale = 1.0  # 内部渲染分辨率与窗口之比，鼠标坐标按内部分辨率给出，判定范围随之缩放
+
+    def reset(self):
+        """清空当前滑动（暂停画面切换时调用），轨迹随之擦除"""
+        self.active = False
+        self.total = 0
+        self.stroke += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def _append(self, pos, ticks):
+        if self.total:
+            last = self.samples[(self.total - 1) % self.capacity]
+            if abs(pos[0] - last[0]) + abs(pos[1] - last[1]) < self.min_step:
+                return
+        self.samples[self.total % self.capacity] = (pos[0], pos[1], ticks)
+        if not self.total:
+            self.origin[:] = self.samples[0]
+        self.total += 1
+
+    def points(self, count=None):
+        """最近 count 个采样点（按时间顺序），用于绘制轨迹"""
+        size = len(self)
+        count = size if count is None else min(count, size)
+        start = self.total - count
+        index = np.arange(start, self.total) % self.capacity
+        return [(int(x), int(y)) for x, y in self.samples[index, :2]]
+
+    def feed(self, event, direction, gestures=None):
+        """处理一个输入事件，松开鼠标且滑动符合 direction 时返回 True；gestures 为该章节的方向表（默认 GESTURES）"""
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.reset()
+            self.active = True
+            self._append(event.pos, pygame.time.get_ticks())
+        elif event.type == pygame.MOUSEMOTION and self.active:
+            self._append(event.pos, pygame.time.get_ticks())
+        elif event.type == pygame.MOUSEBUTTONUP and self.active:
+            ticks = pygame.time.get_ticks()
+            self._append(event.pos, ticks)
+            self.active = False
+            gesture = (gestures or self.gestures).get(direction)
+            return gesture is not None and self.matches(gesture, event.pos, ticks)
+        return False
+
+    def matches(self, gesture, end_pos, end_ticks):
+        """判断以 end_pos 结束的滑动是否符合 gesture：按下位置到 end_pos 的位移落在两个轴的范围内，且从按下到松开不超过时间上限"""
+        if end_ticks - self.origin[2] >= gesture.max_duration:
+            return False
+        dx = end_pos[0] - float(self.origin[0])
+        dy = end_pos[1] - float(self.origin[1])
+        return _within(dx, gesture.dx, self.scale) and _within(dy, gesture.dy, self.scale)
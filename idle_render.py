@@ -0,0 +1,85 @@
+import pygame
+
+IDLE_TIMEOUT = 500  # 等待输入时单次阻塞的最长时间（毫秒），留给需要定时刷新的动画
+
+
+def wait_events(timeout=IDLE_TIMEOUT):
+    """阻塞等待输入事件，返回本次唤醒时队列中的全部事件，超时返回空列表"""
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+
+class ignore_motion:
+    """只等待点击时屏蔽鼠标移动事件，避免每次移动都唤醒等待循环"""
+
+    def __enter__(self):
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
+        return self
+
+    def __exit__(self, *exc_info):
+        pygame.event.set_allowed(pygame.MOUSEMOTION)
+
+
+class PausedFrameView:
+    """暂停画面：静止的视频帧加上提示文字等覆盖层，进入时整屏绘制一次，之后只重绘变化的区域"""
+
+    def __init__(self, screen, bg_color, frame_surface, frame_pos, trail_color=(255, 0, 0), trail_width=3):
+        self.screen = screen
+        self.bg_color = bg_color
+        self.frame_surface = frame_surface
+        self.frame_pos = frame_pos
+        self.trail_color = trail_color
+        self.trail_width = trail_width
+        self.overlays = []  # [(surface, rect)]
+        self._stroke = None  # 已绘制轨迹所属的滑动序号
+        self._trail_drawn = 0  # 已绘制的采样点数
+        self._trail_rect = None  # 已绘制轨迹的包围盒
+
+    def show(self, overlays):
+        """绘制静止帧和覆盖层，并整屏刷新一次"""
+        self.overlays = list(overlays)
+        if self.frame_surface:
+            # 使用存储的偏移量绘制视频帧
+            self.screen.blit(self.frame_surface, self.frame_pos)
+        for surface, rect in self.overlays:
+            self.screen.blit(surface, rect)
+        pygame.display.flip()
+
+    def restore(self, rect):
+        """把 rect 区域恢复为静止帧和覆盖层，返回需要刷新的区域"""
+        self.screen.set_clip(rect)
+        self.screen.fill(self.bg_color)
+        if self.frame_surface:
+            self.screen.blit(self.frame_surface, self.frame_pos)
+        for surface, overlay_rect in self.overlays:
+            if overlay_rect.colliderect(rect):
+                self.screen.blit(surface, overlay_rect)
+        self.screen.set_clip(None)
+        return rect
+
+    def update_trail(self, gestures, dirty):
+        """增量绘制 GestureTracker 记录的滑动轨迹：只画新增的线段；开始新的滑动时擦除旧轨迹。变化区域追加到 dirty"""
+        if gestures.stroke != self._stroke:
+            if self._trail_rect is not None:
+                dirty.append(self.restore(self._trail_rect))
+            self._stroke = gestures.stroke
+            self._trail_drawn = 0
+            self._trail_rect = None
+        new_points = gestures.total - self._trail_drawn
+        if new_points > 0 and len(gestures) > 1:
+            # 连同上一次画到的点一起取出，使新线段与已有轨迹相连
+            segment = gestures.points(new_points + 1 if self._trail_drawn else new_points)
+            if len(segment) > 1:
+                rect = pygame.draw.lines(self.screen, self.trail_color, False, segment, self.trail_width)
+                rect.inflate_ip(self.trail_width, self.trail_width)
+                # 提示文字保持在轨迹之上
+                for surface, overlay_rect in self.overlays:
+                    if overlay_rect.colliderect(rect):
+                        self.screen.blit(surface, overlay_rect)
+                        rect.union_ip(overlay_rect)
+                self._trail_rect = rect if self._trail_rect is None else self._trail_rect.union(rect)
+                dirty.append(rect)
+            self._trail_drawn = gestures.total
+        return dirty
@@ -0,0 +1,148 @@
+"""关键帧索引：每个视频只扫描一次（只解封装、不解码），记录关键帧的帧号和时间戳并保存到缓存目录，
+跳转到视频中任意一帧时从之前最近的关键帧开始，最多解码一个 GOP 即可精确到达。
+
+预先为所有视频建立索引：python keyframe_index.py [视频文件 ...]（默认为 res/ 下的全部 mp4）
+"""
+import bisect
+import glob
+import hashlib
+import json
+import os
+import sys
+
+import cv2
+
+from asset_pack import open_video, stat
+from frame_cache import cache_root
+
+
+class KeyframeIndex:
+    """一个视频的关键帧列表（帧号升序）及对应的时间戳（毫秒）"""
+
+    def __init__(self, frames, times, frame_count, fps, exact=True):
+        self.frames = frames
+        self.times = times
+        self.frame_count = frame_count
+        self.fps = fps
+        self.exact = exact  # 为 False 时后端不支持读取关键帧标记，只知道第 0 帧是关键帧
+
+    def keyframe_before(self, frame):
+        """不晚于 frame 的最近关键帧帧号"""
+        i = bisect.bisect_right(self.frames, frame) - 1
+        return self.frames[i] if i >= 0 else 0
+
+    def to_dict(self):
+        return {"frames": self.frames, "times": self.times, "frame_count": self.frame_count, "fps": self.fps,
+                "exact": self.exact}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["frames"], data["times"], data["frame_count"], data["fps"], data.get("exact", True))
+
+
+def scan(video_path):
+    """扫描视频的关键帧：以原始数据模式读取（FFmpeg 后端，只解封装），检查每个数据包的关键帧标记"""
+    cap = open_video(video_path, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        cap.release()
+        cap = open_video(video_path)
+        if not cap.isOpened():
+            return None
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        cap.release()
+        return KeyframeIndex([0], [0.0], frame_count, fps, exact=False)
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    times = []
+    count = 0
+    while cap.grab():
+        if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+            frames.append(count)
+            times.append(round(cap.get(cv2.CAP_PROP_POS_MSEC), 3))
+        count += 1
+    cap.release()
+    if not frames or frames[0] != 0:
+        frames.insert(0, 0)
+        times.insert(0, 0.0)
+    return KeyframeIndex(frames, times, count, fps)
+
+
+class KeyframeStore:
+    """关键帧索引的持久化存储：按 (视频路径, 文件大小, 修改时间) 保存在缓存目录，进程内同一视频只读取一次"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(cache_root(), "keyframes")
+        self.indexes = {}  # 视频路径 -> KeyframeIndex
+
+    def key(self, video_path):
+        size, mtime_ns = stat(video_path)
+        text = f"{os.path.abspath(video_path)}|{size}|{mtime_ns}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def index_path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, video_path):
+        """返回视频的关键帧索引，没有时扫描并保存；视频无法打开时返回 None"""
+        index = self.indexes.get(video_path)
+        if index is not None:
+            return index
+        try:
+            path = self.index_path(self.key(video_path))
+        except OSError:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                index = KeyframeIndex.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            index = scan(video_path)
+            if index is None:
+                return None
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(index.to_dict(), f)
+            except OSError as e:
+                print(f"无法保存关键帧索引: {e}")
+        self.indexes[video_path] = index
+        return index
+
+    def seek(self, cap, video_path, frame):
+        """把 cap 定位到第 frame 帧（下一次 read 返回该帧）：先跳到之前最近的关键帧，再只 grab 到目标帧。
+        返回实际到达的帧号"""
+        if frame <= 0:
+            return 0
+        if getattr(cap, "random_access", False):
+            # 帧缓存等可随机访问的来源直接定位
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            return int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        index = self.get(video_path)
+        keyframe = index.keyframe_before(frame) if index is not None else 0
+        if keyframe > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != keyframe:
+                # 后端定位不准确时退回从头 grab，保证帧号准确
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                keyframe = 0
+        position = keyframe
+        while position < frame and cap.grab():
+            position += 1
+        return position
+
+
+def main(paths):
+    store = KeyframeStore()
+    for path in paths or sorted(glob.glob(os.path.join("res", "*.mp4"))):
+        index = store.get(path)
+        if index is None:
+            print(f"无法打开视频文件: {path}")
+            continue
+        gop = max((b - a for a, b in zip(index.frames, index.frames[1:])), default=index.frame_count)
+        print(f"{path}: {index.frame_count} 帧，{len(index.frames)} 个关键帧，最大间隔 {gop} 帧"
+              + ("" if index.exact else "（后端不支持关键帧标记，跳转时从头 grab）"))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,301 +1,476 @@
 import pygame
-import cv2
 import sys
 import os
-import numpy as np
-from main2 import Game as SecondChapter
-import main2
-
-def resource_path(relative_path):
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-
-class Game:
-    def __init__(self):
-        pygame.init()
-        pygame.mixer.init()
-
-        infoObject = pygame.display.Info()
-        self.screen_width = int(infoObject.current_w)
-        self.screen_height = int(infoObject.current_h)
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-        pygame.display.set_caption("秒速五厘米")
-
-        # 加载字体
-        font_filename = 'res/simhei.ttf'
-        font_path = resource_path(font_filename)
-        if not os.path.isfile(font_path):
-            print(f"字体文件 {font_path} 不存在，请确保字体文件在项目目录中。")
-            pygame.quit()
-            sys.exit()
-        self.font_large = pygame.font.Font(font_path, 48)
-        self.font_small = pygame.font.Font(font_path, 24)
+import time
+import asset_pack
+from text_cache import text_cache
+from scene_triggers import TriggerTable
+from av_sync import AVSync, PlaybackClock, pause_music, resync
+from runtime import ChapterView, get_runtime, resource_path
+from idle_render import PausedFrameView, ignore_motion, wait_events
+
+# 标题画面显示之后才在后台加载的模块（OpenCV 和后续章节），启动时不等待它们
+DEFERRED_MODULES = ("cv2", "video_decoder", "frame_cache", "clip_prefetch", "gestures", "frame_profiler",
+                    "parallel_decoder", "audio_cache", "main2", "main3")
+
+
+class Game(ChapterView):
+    def __init__(self, runtime=None):
+        # 窗口、音频、字体和缓存由所有章节共用，进入第二章时直接复用
+        super().__init__(runtime or get_runtime())
 
         self.bg_color = (0, 0, 0)
         self.prompt_text_color = (255, 0, 0)
         self.text_color = (255, 255, 255)
 
+        # 预先渲染标题画面和第一章用到的文字（竖排标题逐字渲染）
+        text_cache.warm(self.font_large, "秒速五厘米" + "秒速５センチメートル", self.text_color)
+        text_cache.warm(self.font_large, ["序章", "第一章 樱花抄"], self.text_color)
+        text_cache.warm(self.font_small, ["点击屏幕继续", "点击继续", "第一章 桜花抄", "故事发展会发生改变 请谨慎选择"],
+                        self.text_color)
+
         self.state = "title"
+        self.preloaded = False  # 是否已开始后台加载其余模块
 
         # 视频播放相关
         self.cap = None
         self.video_playing = False
-        self.clock = pygame.time.Clock()
         self.fps = 30  # 默认帧率
         self.frame_delay = 1 / self.fps
         self.current_frame = 0  # 初始化 current_frame
+        self.start_frame = 0  # 本次播放开始的帧号
+        self.resume_frame = 0  # 继续游戏时第一章视频开始的帧号
         self.last_frame_surface = None  # 存储最后一帧
-
-        # 音频相关
-        self.audio_path = resource_path("res/chapter_one.mp3")  # 确保音频文件路径正确
-        if not os.path.isfile(self.audio_path):
-            print(f"音频文件 {self.audio_path} 不存在，请确保音频文件在项目目录中。")
-            pygame.quit()
-            sys.exit()
+        self.decoder = None  # 后台解码线程
+        self.av_sync = None  # 音画同步状态（偏移、丢帧数）
+
+        # 音频相关：没有单独的音频文件时（已用 mux_assets.py 合并）使用视频文件中的音轨
+        self.video_path = resource_path("res/chapter_one.mp4")
+        self.audio_path = resource_path("res/chapter_one.mp3")
+        if not asset_pack.exists(self.audio_path):
+            self.audio_path = None
         self.audio_loaded = False
+        self.music = None  # 第一章的音频（MusicSource），快进结束后由它重新定位播放
 
         # 交互相关
-        self.pause_frame_number_1 = None
-        self.pause_frame_number_2 = None
+        self.triggers = None  # 当前视频的触发表
+        self.active_trigger = None  # 正在等待完成的滑动触发点
+        self.pending_triggers = []
         self.interaction_done = False
         self.swipe_prompt_displayed = False
 
-        # Swipe detection variables
-        self.swipe_start_pos = None
-        self.swipe_end_pos = None
-        self.swipe_threshold = 100  # 最小滑动距离
-        self.swipe_allowed_time = 1000  # 最大滑动时间（毫秒）
-        self.swipe_start_time = None
-        self.swipe_trail = []  # 存储滑动轨迹
+        self.paused_view = None  # 滑动提示暂停画面
+        self.swipe_gestures = None  # 第一章的滑动方向表（第一次显示滑动提示时加载 gestures 模块）
 
         # 存储视频偏移量
         self.x_offset = 0
         self.y_offset = 0
+        self.layout = None  # 当前已绘制黑边的视频布局
+        self.skip = False  # 已看过第一章视频，直接跳到下一个交互
 
     def draw_vertical_text(self, text, x, y, font):
         """垂直绘制文本"""
         for i, char in enumerate(text):
-            rendered_char = font.render(char, True, self.text_color)
+            rendered_char = text_cache.render(font, char, self.text_color)
             self.screen.blit(rendered_char, (x, y + i * rendered_char.get_height()))
 
-    def play_video_init(self, video_path):
-        """初始化视频播放"""
-        self.cap = cv2.VideoCapture(video_path)
+    def play_video_init(self, video_path, start_frame=0, skip=False):
+        """初始化视频播放，start_frame 不为 0 时借助关键帧索引从该帧开始。skip 为 True 时直接跳到下一个触发点"""
+        import cv2
+        from video_decoder import FrameDecoder
+
+        # 资源清单中有分辨率版本时解码与屏幕匹配的版本
+        decode_path = self.runtime.manifest.variant(video_path, self.screen_width, self.screen_height)
+
+        # 有有效的帧缓存时直接从内存映射读取已缩放的帧
+        self.cap = None
+        if self.frame_cache is not None:
+            self.cap = self.frame_cache.open(decode_path, self.screen_width, self.screen_height)
+        if self.cap is None:
+            self.cap = asset_pack.open_video(decode_path)
         if not self.cap.isOpened():
             print(f"无法打开视频文件: {video_path}")
             return False
 
-        # 获取视频帧率和总帧数
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        # 获取视频帧率和总帧数（资源清单中已有时直接使用）
+        entry = self.runtime.manifest.get(video_path)
+        if entry is not None:
+            self.fps, frame_count = entry["fps"], entry["frames"]
+        else:
+            self.fps, frame_count = self.cap.get(cv2.CAP_PROP_FPS), self.cap.get(cv2.CAP_PROP_FRAME_COUNT)
         if self.fps == 0:
             self.fps = 30  # 默认帧率
         self.frame_delay = 1 / self.fps
         self.video_playing = True
-        self.current_frame = 0  # 重置帧计数器
 
-        # 获取暂停帧点（假设需要在24秒和27秒暂停）
-        self.pause_frame_number_1 = int(24 * self.fps)
-        self.pause_frame_number_2 = int(27 * self.fps)
+        # 编译滑动触发表（在24秒和27秒暂停）
+        self.triggers = TriggerTable(self.fps, swipe_scenes=[
+            {'time': 24, 'direction': 'right', 'message': "将鼠标放置中心，向右滑动继续"},
+            {'time': 27, 'direction': 'right_up', 'message': "请向右上滑动继续"},
+        ])
+        self.skip = skip
+        if skip:
+            self.triggers.resume_after(start_frame)
+            if self.triggers.next_frame is not None:
+                start_frame = self.trigger_limit()
+
+        # 高分辨率视频可由进程池分段并行解码（设置 PARALLEL_DECODE 时）
+        self.decoder = None
+        parallel = self.runtime.parallel_decode
+        if parallel is not None and isinstance(self.cap, cv2.VideoCapture):
+            self.decoder = parallel.open(self.cap, decode_path, self.runtime.keyframes, self.screen_width,
+                                         self.screen_height, start_frame)
+        if self.decoder is not None:
+            self.start_frame = self.decoder.start_index
+            self.decoder.start()
+        else:
+            # 定位到开始的帧
+            self.start_frame = self.runtime.keyframes.seek(self.cap, decode_path, start_frame) if start_frame > 0 else 0
+
+            # 从头正常解码时顺便写入帧缓存
+            recorder = None
+            if self.frame_cache is not None and isinstance(self.cap, cv2.VideoCapture) and self.start_frame == 0:
+                recorder = self.frame_cache.writer(decode_path, self.screen_width, self.screen_height,
+                                                   self.fps, frame_count)
+
+            # 启动后台解码线程
+            self.decoder = FrameDecoder(self.cap, self.screen_width, self.screen_height, self.frame_queue_size,
+                                        recorder=recorder, profiler=self.runtime.profiler,
+                                        start_index=self.start_frame).start()
+        self.current_frame = self.start_frame  # 重置帧计数器
+        if self.runtime.governor:
+            self.runtime.governor.attach(self.decoder)
+
+        # 继续游戏时保存的是完成触发点后的 current_frame，该触发点不再触发
+        self.triggers.resume_after(self.start_frame)
+        self.pending_triggers = []
 
         return True
 
+    def trigger_limit(self):
+        """下一个触发点生效前显示的最后一帧（当前帧序号 + 1 到达触发帧时触发），没有触发点时返回 None"""
+        next_trigger = self.triggers.next_frame
+        return None if next_trigger is None else next_trigger - 1
+
     def play_video_frame_func(self):
         """播放视频的单帧"""
-        ret, frame = self.cap.read()
-        if not ret:
-            self.video_playing = False
-            return False  # 视频播放结束
-
-        self.current_frame += 1
-
-        # 转换颜色从 BGR 到 RGB
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # 获取原始宽高比，保持视频比例
-        original_height, original_width, _ = frame.shape
-        aspect_ratio = original_width / original_height
-        target_width = self.screen_width
-        target_height = int(self.screen_width / aspect_ratio)
-
-        if target_height > self.screen_height:
-            target_height = self.screen_height
-            target_width = int(self.screen_height * aspect_ratio)
-
-        frame = cv2.resize(frame, (target_width, target_height))
-
-        # 居中视频
-        self.x_offset = (self.screen_width - target_width) // 2
-        self.y_offset = (self.screen_height - target_height) // 2
-
-        # 将帧转换为 Pygame 的 Surface
-        frame_surface = pygame.surfarray.make_surface(frame)
-
-        # 添加旋转和翻转以修正视频方向
-        frame_surface = pygame.transform.rotate(frame_surface, -90)  # 旋转90度逆时针
-        frame_surface = pygame.transform.flip(frame_surface, True, False)  # 水平翻转
+        from frame_profiler import GET, SYNC, LETTERBOX, BLIT, HUD, UPDATE
+
+        # 可选的分阶段计时和自适应画质，未启用时为 None
+        profiler = self.runtime.profiler
+        stages = profiler.render if profiler else None
+        governor = self.runtime.governor
+        while True:
+            if stages:
+                stages.begin()
+            if governor:
+                governor.begin()
+            decoded = self.decoder.get()
+            if stages:
+                stages.lap(GET)
+            if decoded is None:
+                self.stop_video()
+                return False  # 视频播放结束
+            if decoded.layout.screen_size != (self.screen_width, self.screen_height):
+                continue  # 内部分辨率或窗口刚变化，队列中按旧尺寸缩放的帧直接丢弃
+
+            # 快进时按原帧率显示跳跃的帧；回到逐帧解码后音频定位到当前画面
+            fast_forward = self.fast_forward
+            fast_forwarding = fast_forward.active or fast_forward.draining
+            if fast_forwarding:
+                if not fast_forward.pace(decoded.index, self.fps):
+                    self.av_sync = resync(self.fps, decoded.index, self.music)
+                break
+
+            # 落后时丢弃该帧并让解码线程跳过后续帧，但不越过下一个触发点，保证触发帧准确
+            next_trigger = self.triggers.next_frame
+            if self.av_sync.schedule(decoded.index, next_trigger is None or decoded.index + 1 < next_trigger):
+                break
+            skip_target = self.av_sync.target_frame()
+            if next_trigger is not None:
+                skip_target = min(skip_target, next_trigger - 1)
+            self.decoder.skip_to(skip_target)
+            if governor:
+                governor.dropped()
+        if stages:
+            stages.lap(SYNC)
+
+        self.current_frame = decoded.index + 1
+
+        # 布局变化（新视频或窗口变化）时才绘制黑边并整屏刷新
+        full_update = decoded.layout is not self.layout
+        if full_update:
+            self.layout = decoded.layout
+            self.layout.paint_letterbox(self.screen, self.bg_color)
+            self.x_offset, self.y_offset = self.layout.position
+        if stages:
+            stages.lap(LETTERBOX)
 
         # 存储当前帧
-        self.last_frame_surface = frame_surface.copy()
-
-        self.screen.fill(self.bg_color)
-        self.screen.blit(frame_surface, (self.x_offset, self.y_offset))
-        pygame.display.update()
+        self.last_frame_surface = decoded.surface
+
+        self.screen.blit(decoded.surface, self.layout.position)
+        if stages:
+            stages.lap(BLIT)
+
+        hud_rect = None
+        if profiler and profiler.hud_visible:
+            hud_rect = profiler.draw_hud(self.screen, self.font_small, self.av_sync.drift, self.decoder.depth(),
+                                         governor.label if governor else None)
+            if stages:
+                stages.lap(HUD)
+
+        # 只刷新视频区域
+        if full_update:
+            pygame.display.update()
+        elif hud_rect:
+            pygame.display.update([self.layout.rect, hud_rect])
+        else:
+            pygame.display.update(self.layout.rect)
+        if stages:
+            stages.lap(UPDATE)
+            stages.end()
+
+        # 每帧耗时持续超出预算时降低画质，内部分辨率变化时按新尺寸重新布局
+        if governor and not fast_forwarding and governor.end(self.fps, self.av_sync.waited, self.trigger_limit()):
+            self.decoder.resize_screen(self.screen_width, self.screen_height)
+            self.layout = None
         return True
 
+    def stop_video(self):
+        """停止后台解码并释放视频"""
+        if self.decoder:
+            self.decoder.stop()
+            self.decoder = None
+        self.video_playing = False
+
     def play_audio(self):
-        """播放音频"""
-        try:
-            pygame.mixer.music.load(self.audio_path)
-            pygame.mixer.music.play()
-            self.audio_loaded = True
-        except pygame.error as e:
-            print(f"无法播放音频文件: {e}")
-            self.audio_loaded = False
+        """播放音频（从视频开始的位置开始）。音频在标题画面显示后已在后台解码为 PCM，这里不再等待解码"""
+        self.music = self.runtime.audio_cache.music(self.video_path, self.audio_path)
+        self.audio_loaded = self.music is not None and self.music.play_from(self.start_frame / self.fps)
 
     def stop_audio(self):
         pygame.mixer.music.stop()
 
-    def detect_swipe(self, event, direction="right"):
-        """检测鼠标滑动事件"""
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            self.swipe_start_pos = event.pos
-            self.swipe_start_time = pygame.time.get_ticks()
-            self.swipe_trail = [self.swipe_start_pos]  # 初始化滑动轨迹
-        elif event.type == pygame.MOUSEMOTION and self.swipe_start_pos:
-            self.swipe_trail.append(event.pos)  # 记录滑动轨迹
-        elif event.type == pygame.MOUSEBUTTONUP and self.swipe_start_pos:
-            self.swipe_end_pos = event.pos
-            swipe_time = pygame.time.get_ticks() - self.swipe_start_time
-            dx = self.swipe_end_pos[0] - self.swipe_start_pos[0]
-            dy = self.swipe_end_pos[1] - self.swipe_start_pos[1]
-
-            if direction == "right":
-                result = dx > self.swipe_threshold and abs(dy) < self.swipe_threshold and swipe_time < self.swipe_allowed_time
-            elif direction == "right_up":
-                result = dx > self.swipe_threshold and dy < -self.swipe_threshold and swipe_time < self.swipe_allowed_time
-            else:
-                result = False
-
-            self.swipe_start_pos = None
-            self.swipe_end_pos = None
-            return result
-        return False
-
-    def draw_swipe_trail(self):
-        """绘制滑动轨迹"""
-        if len(self.swipe_trail) > 1:
-            pygame.draw.lines(self.screen, (255, 0, 0), False, self.swipe_trail, 3)
+    def finish_video(self):
+        """第一章视频结束（或已看过时跳过剩余部分）：保存进度并进入章节结束画面"""
+        self.stop_video()
+        profiler = self.runtime.profiler
+        if profiler and self.av_sync is not None and self.av_sync.clock.start_latency is not None:
+            profiler.record_audio_start(self.av_sync.clock.start_latency)
+        self.runtime.checkpoints.save("chapter_two", seen="res/chapter_one.mp4")
+        self.state = "chapter_one_end"
 
     def chapter_one_end(self):
         """第一章结束后的逻辑"""
         self.screen.fill(self.bg_color)
-        end_text = self.font_large.render("第一章 樱花抄", True, self.text_color)
+        end_text = text_cache.render(self.font_large, "第一章 樱花抄", self.text_color)
         self.screen.blit(end_text, ((self.screen_width - end_text.get_width()) // 2, self.screen_height // 3))
-        japanese_text = self.font_small.render("第一章 桜花抄", True, self.text_color)
+        japanese_text = text_cache.render(self.font_small, "第一章 桜花抄", self.text_color)
         self.screen.blit(japanese_text, ((self.screen_width - japanese_text.get_width()) // 2, self.screen_height // 2))
-        click_text = self.font_small.render("故事发展会发生改变 请谨慎选择", True, self.text_color)
+        click_text = text_cache.render(self.font_small, "故事发展会发生改变 请谨慎选择", self.text_color)
         self.screen.blit(click_text, ((self.screen_width - click_text.get_width()) // 2, self.screen_height - 50))
         pygame.display.flip()
 
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    # 调用第二章逻辑
-                    second_chapter = SecondChapter(self.screen_width, self.screen_height)
-                    second_chapter.chapter_two()
-                    waiting = False
-
-    def run(self):
+        with ignore_motion():
+            waiting = True
+            while waiting:
+                for event in wait_events():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        waiting = False
+                        break
+        # 调用第二章逻辑
+        self.start_chapter("chapter_two")
+
+    def start_chapter(self, chapter, start_node=None, start_frame=0):
+        """进入第二章或第三章，继续游戏时从存档的节点和帧号开始"""
+        if chapter == "chapter_three":
+            from main3 import Game as ThirdChapter
+            ThirdChapter(runtime=self.runtime).chapter_three(start_node, start_frame)
+        else:
+            from main2 import Game as SecondChapter
+            SecondChapter(runtime=self.runtime).chapter_two(start_node, start_frame)
+
+    def resume(self):
+        """从存档继续：第一章回到视频中保存的帧，第二、三章直接进入保存的剧情节点。
+        返回存档的章节，没有存档时返回 None"""
+        state = self.runtime.checkpoints.load()
+        if state is None:
+            print("没有可以继续的进度，从头开始")
+            return None
+        print(f"继续游戏: {state['chapter']} {state['node'] or '起点'} 第 {state['frame']} 帧")
+        if state["chapter"] == "chapter_one":
+            self.resume_frame = state["frame"]
+            self.state = "chapter_one_video"
+        else:
+            self.start_chapter(state["chapter"], state["node"], state["frame"])
+        return state["chapter"]
+
+    def title_shown(self):
+        """标题画面已显示：开始在后台加载其余模块。设置 STARTUP_PROBE 时输出显示时刻后退出，供 startup_check.py 测量启动耗时"""
+        if os.environ.get("STARTUP_PROBE"):
+            loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+            print(f"title_shown {time.time():.6f} {','.join(loaded) or '-'}", flush=True)
+            pygame.quit()
+            sys.exit()
+        if not self.preloaded:
+            self.preloaded = True
+            # 第一章的音频也在后台解码为 PCM，开始播放时没有解码延迟
+            self.runtime.preload(*DEFERRED_MODULES, audio_paths=[self.audio_path or self.video_path],
+                                 tasks=[self.warm_later_chapters])
+
+    def warm_later_chapters(self):
+        """在后台加载线程中预先渲染第二、三章剧情中的文字，章节切换时不再同步渲染"""
+        from main2 import Game as SecondChapter
+        from main3 import Game as ThirdChapter
+        for chapter in (SecondChapter, ThirdChapter):
+            chapter.warm_text(self.runtime)
+
+    def show_paused_prompt(self):
+        """暂停在当前帧上显示滑动提示，之后只增量重绘滑动轨迹"""
+        prompt_text = text_cache.render(self.font_small, self.active_trigger.message, self.prompt_text_color)
+        prompt_rect = prompt_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
+        from gestures import CHAPTER_ONE_GESTURES
+        self.swipe_gestures = CHAPTER_ONE_GESTURES  # 第一章沿用自己的判定范围
+        self.gestures.reset()
+        self.paused_view = PausedFrameView(self.screen, self.bg_color, self.last_frame_surface,
+                                           (self.x_offset, self.y_offset))
+        self.paused_view.show([(prompt_text, prompt_rect)])
+
+    def run(self, resume=False):
         running = True
+        if resume and self.resume() not in (None, "chapter_one"):
+            running = False  # 后续章节已经运行完毕
+        drawn_state = None  # 静态画面只在进入该状态时绘制一次
         while running:
-            if self.state != "playing_video":
-                self.clock.tick(60)  # 控制主循环的最大帧率
+            if self.state == "playing_video" or drawn_state != self.state:
+                events = pygame.event.get()
+            else:
+                # 静态画面已绘制，没有需要定时刷新的内容，阻塞等待输入事件
+                events = wait_events()
 
-            for event in pygame.event.get():
+            dirty = []
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
-                elif self.state == "swipe_1" and self.detect_swipe(event, "right"):
-                    pygame.mixer.music.unpause()
-                    self.state = "playing_video"
-                elif self.state == "swipe_2" and self.detect_swipe(event, "right_up"):
-                    pygame.mixer.music.unpause()
-                    self.state = "playing_video"
+                    elif event.key == pygame.K_F3 and self.state == "playing_video":
+                        # 显示或隐藏帧计时 HUD，隐藏时重绘被覆盖的区域
+                        if not self.runtime.toggle_hud().hud_visible:
+                            self.layout = None
+                    elif event.key == pygame.K_TAB and self.state == "playing_video":
+                        # 开始或结束快进
+                        if self.fast_forward.active:
+                            self.fast_forward.stop(self.decoder, self.current_frame - 1)
+                        else:
+                            self.fast_forward.start(self.decoder, self.trigger_limit())
+                elif self.state == "swipe" and self.gestures.feed(event, self.active_trigger.direction, self.swipe_gestures):
+                    if self.pending_triggers:
+                        self.active_trigger = self.pending_triggers.pop(0)
+                        self.show_paused_prompt()
+                        dirty = []
+                    elif self.skip and self.triggers.next_frame is None:
+                        # 已看过：最后一个触发点之后的部分不再播放
+                        pygame.mixer.music.stop()
+                        self.paused_view = None
+                        self.finish_video()
+                    else:
+                        # 暂停时音频已停止，从触发点之后重新播放
+                        self.av_sync = resync(self.fps, self.current_frame, self.music)
+                        self.layout = None  # 提示文字和滑动轨迹可能覆盖黑边，恢复播放时重绘
+                        self.paused_view = None
+                        self.state = "playing_video"
+                        # 保存进度：继续游戏时从触发点之后开始
+                        self.runtime.checkpoints.save("chapter_one", frame=self.current_frame)
+                        if self.skip:
+                            # 已看过：只 grab 到下一个触发点
+                            limit = self.trigger_limit()
+                            self.fast_forward.start(self.decoder, limit, step=limit + 1)
+                elif self.state == "swipe":
+                    self.paused_view.update_trail(self.gestures, dirty)  # 增量绘制滑动轨迹
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if self.state == "title":
                         self.state = "chapter_one"
                     elif self.state == "chapter_one":
                         self.state = "chapter_one_video"
+            if dirty:
+                pygame.display.update(dirty)
 
             # 根据当前状态执行相应的逻辑
             if self.state == "title":
-                self.screen.fill(self.bg_color)
-                self.draw_vertical_text("秒速五厘米", self.screen_width // 2 - 80, self.screen_height // 4, self.font_large)
-                self.draw_vertical_text("秒速５センチメートル", self.screen_width // 2 + 50, self.screen_height // 4, self.font_large)
-                click_text = self.font_small.render("点击屏幕继续", True, self.text_color)
-                self.screen.blit(click_text, ((self.screen_width - click_text.get_width()) // 2, self.screen_height - 50))
+                if drawn_state != "title":
+                    self.screen.fill(self.bg_color)
+                    self.draw_vertical_text("秒速五厘米", self.screen_width // 2 - 80, self.screen_height // 4, self.font_large)
+                    self.draw_vertical_text("秒速５センチメートル", self.screen_width // 2 + 50, self.screen_height // 4, self.font_large)
+                    click_text = text_cache.render(self.font_small, "点击屏幕继续", self.text_color)
+                    self.screen.blit(click_text, ((self.screen_width - click_text.get_width()) // 2, self.screen_height - 50))
+                    pygame.display.flip()
+                    self.title_shown()
 
             elif self.state == "chapter_one":
-                self.screen.fill(self.bg_color)
-                chapter_text = self.font_large.render("序章", True, self.text_color)
-                self.screen.blit(chapter_text, ((self.screen_width - chapter_text.get_width()) // 2, self.screen_height // 2))
-                click_text = self.font_small.render("点击继续", True, self.text_color)
-                self.screen.blit(click_text, ((self.screen_width - click_text.get_width()) // 2, self.screen_height - 50))
+                if drawn_state != "chapter_one":
+                    self.screen.fill(self.bg_color)
+                    chapter_text = text_cache.render(self.font_large, "序章", self.text_color)
+                    self.screen.blit(chapter_text, ((self.screen_width - chapter_text.get_width()) // 2, self.screen_height // 2))
+                    click_text = text_cache.render(self.font_small, "点击继续", self.text_color)
+                    self.screen.blit(click_text, ((self.screen_width - click_text.get_width()) // 2, self.screen_height - 50))
+                    pygame.display.flip()
 
             elif self.state == "chapter_one_video":
                 # 初始化视频播放
-                video_path = resource_path("res/chapter_one.mp4")
-                if self.play_video_init(video_path):
+                # --skip-seen 且已看过第一章时直接跳到下一个交互
+                skip = self.runtime.skip_seen and "res/chapter_one.mp4" in self.runtime.checkpoints.state["seen"]
+                if self.play_video_init(self.video_path, self.resume_frame, skip):
+                    self.resume_frame = 0
+                    self.runtime.checkpoints.save("chapter_one", frame=self.start_frame)
                     # 播放音频
                     self.play_audio()
+                    # 以音频为主时钟同步画面
+                    self.av_sync = AVSync(self.fps, PlaybackClock(use_audio=self.audio_loaded,
+                                                                  offset=self.start_frame / self.fps))
                     self.state = "playing_video"
                 else:
                     running = False  # 无法播放视频，退出游戏
 
             elif self.state == "playing_video":
-                self.clock.tick(self.fps)  # 控制视频播放的帧率
                 frame_result = self.play_video_frame_func()
                 if not frame_result:
-                    self.state = "chapter_one_end"
-                elif self.current_frame == self.pause_frame_number_1:
-                    pygame.mixer.music.pause()
-                    self.state = "swipe_1"
-                elif self.current_frame == self.pause_frame_number_2:
-                    pygame.mixer.music.pause()
-                    self.state = "swipe_2"
-
-            elif self.state == "swipe_1" or self.state == "swipe_2":
-                if self.last_frame_surface:
-                    # 使用存储的偏移量绘制视频帧
-                    self.screen.blit(self.last_frame_surface, (self.x_offset, self.y_offset))
-                self.draw_swipe_trail()  # 绘制滑动轨迹
-                prompt_text = self.font_small.render(
-                    "将鼠标放置中心，向右滑动继续" if self.state == "swipe_1" else "请向右上滑动继续", True, self.prompt_text_color
-                )
-                prompt_rect = prompt_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
-                self.screen.blit(prompt_text, prompt_rect)
+                    self.finish_video()
+                else:
+                    self.pending_triggers.extend(self.triggers.due(self.current_frame))
+                    if self.pending_triggers and self.fast_forward.active:
+                        # 快进停在触发点，滑动后音频定位到触发点之后继续
+                        self.fast_forward.stop(self.decoder, self.current_frame - 1, drain=False)
+                    if self.pending_triggers:
+                        pause_music()
+                        self.av_sync.pause()
+                        self.active_trigger = self.pending_triggers.pop(0)
+                        self.state = "swipe"
+                        self.show_paused_prompt()
 
             elif self.state == "chapter_one_end":
                 self.chapter_one_end()
                 # 不再设置 running = False，这样主循环可以继续运行
                 running = False  # 如果希望游戏在第二章结束后退出，可以保留此行
 
-            pygame.display.flip()
+            drawn_state = self.state
 
+        self.stop_video()
         pygame.quit()
         sys.exit()
 
 
 if __name__ == "__main__":
+    # 打包后多进程解码的工作进程从这里启动
+    import multiprocessing
+    multiprocessing.freeze_support()
     game = Game()
-    game.run()
+    # --skip-seen：已看过的片段直接跳到下一个交互
+    game.runtime.skip_seen = "--skip-seen" in sys.argv[1:]
+    # --resume：从上次保存的进度继续
+    game.run(resume="--resume" in sys.argv[1:])
@@ -1,290 +1,301 @@
 import pygame
-import cv2
 import sys
-import os
-from main3 import Game as Main3Game
-
-def resource_path(relative_path):
-    """获取资源文件的绝对路径"""
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-class Game:
-    def __init__(self, screen_width, screen_height):
-        pygame.init()
-        pygame.mixer.init()
-
-        self.screen_width = int(screen_width)
-        self.screen_height = int(screen_height)
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-        pygame.display.set_caption("秒速五厘米")
-
-        # 加载字体
-        font_path = resource_path("res/simhei.ttf")
-        if not os.path.isfile(font_path):
-            print(f"字体文件 {font_path} 不存在，请确保字体文件在项目目录中。")
-            pygame.quit()
-            sys.exit()
-
-        self.font_large = pygame.font.Font(font_path, 48)
-        self.font_small = pygame.font.Font(font_path, 24)
-
-        # 定义颜色
-        self.bg_color = (0, 0, 0)  # 背景颜色
-        self.text_color = (255, 255, 255)  # 普通文字颜色（白色）
-        self.prompt_text_color = (255, 0, 0)  # 滑动提示文字颜色（红色）
-        self.choice_text_color = (255, 0, 0)  # 选择按钮文字颜色（红色）
-        self.clock = pygame.time.Clock()
-        self.fps = 30
+from av_sync import AVSync, PlaybackClock, pause_music, resync
+from scene_triggers import TriggerTable, SWIPE
+from story import load_story, run_story
+from text_cache import text_cache
+from runtime import ChapterView, get_runtime, resource_path
+from frame_profiler import GET, SYNC, LETTERBOX, BLIT, HUD, UPDATE, EVENTS
+from idle_render import PausedFrameView, ignore_motion, wait_events
+
+class Game(ChapterView):
+    # 滑动方向对应的提示文字
+    swipe_messages = {
+        "left": "请向左滑动",
+        "left_hand": "请向左滑动牵起手",
+        "left_hug": "请向左滑动拥抱",
+        "right": "请向右滑动",
+        "down": "请向下滑动",
+        "up": "请向上滑动",
+        "left_down": "请向左下滑动",
+    }
+
+    # 定义颜色
+    bg_color = (0, 0, 0)  # 背景颜色
+    text_color = (255, 255, 255)  # 普通文字颜色（白色）
+    prompt_text_color = (255, 0, 0)  # 滑动提示文字颜色（红色）
+    choice_text_color = (255, 0, 0)  # 选择按钮文字颜色（红色）
+
+    def __init__(self, screen_width=None, screen_height=None, runtime=None):
+        # 窗口、音频、字体和缓存由所有章节共用，切换章节时不再重新初始化
+        super().__init__(runtime or get_runtime(screen_width, screen_height))
+
+        # 加载剧情
+        self.story = load_story(resource_path("story.json"))
 
-        # 滑动相关变量
-        self.swipe_start_pos = None
-        self.swipe_end_pos = None
-        self.swipe_threshold = 100  # 最小滑动距离
-        self.swipe_allowed_time = 1000  # 最大滑动时间（毫秒）
-        self.swipe_start_time = None
-        self.swipe_trail = []  # 存储滑动轨迹
+        self.fps = 30
+        self.av_sync = None  # 最近一次播放的音画同步状态（偏移、丢帧数）
 
         self.last_frame_surface = None
         self.x_offset = 0  # 初始化偏移量
         self.y_offset = 0  # 初始化偏移量
 
-    def detect_swipe(self, event, direction):
-        """检测滑动事件"""
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            self.swipe_start_pos = event.pos
-            self.swipe_start_time = pygame.time.get_ticks()
-            self.swipe_trail = [self.swipe_start_pos]
-        elif event.type == pygame.MOUSEMOTION and self.swipe_start_pos:
-            self.swipe_trail.append(event.pos)
-        elif event.type == pygame.MOUSEBUTTONUP and self.swipe_start_pos:
-            end_pos = event.pos
-            time_elapsed = pygame.time.get_ticks() - self.swipe_start_time
-            dx = end_pos[0] - self.swipe_start_pos[0]
-            dy = end_pos[1] - self.swipe_start_pos[1]
-            if direction == "left" and dx < -self.swipe_threshold and abs(
-                    dy) < 50 and time_elapsed < self.swipe_allowed_time:
-                self.swipe_start_pos = None
-                self.swipe_end_pos = None
-                self.swipe_trail = []
-                return True
-            elif direction == "left_hand" and dx < -self.swipe_threshold and abs(
-                    dy) < 50 and time_elapsed < self.swipe_allowed_time:
-                self.swipe_start_pos = None
-                self.swipe_end_pos = None
-                self.swipe_trail = []
-                return True
-            elif direction == "left_hug" and dx < -self.swipe_threshold and abs(
-                    dy) < 50 and time_elapsed < self.swipe_allowed_time:
-                self.swipe_start_pos = None
-                self.swipe_end_pos = None
-                self.swipe_trail = []
-                return True
-            elif direction == "right" and dx > self.swipe_threshold and abs(dy) < 50 and time_elapsed < self.swipe_allowed_time:
-                self.swipe_start_pos = None
-                self.swipe_end_pos = None
-                self.swipe_trail = []
-                return True
-            elif direction == "down" and dy > self.swipe_threshold and abs(dx) < 50 and time_elapsed < self.swipe_allowed_time:
-                self.swipe_start_pos = None
-                self.swipe_end_pos = None
-                self.swipe_trail = []
-                return True
-            elif direction == "up" and dy < -self.swipe_threshold and abs(dx) < 50 and time_elapsed < self.swipe_allowed_time:
-                self.swipe_start_pos = None
-                self.swipe_end_pos = None
-                self.swipe_trail = []
-                return True
-            elif direction == "left_down" and dx < -self.swipe_threshold and dy > self.swipe_threshold and time_elapsed < self.swipe_allowed_time:
-                self.swipe_start_pos = None
-                self.swipe_end_pos = None
-                self.swipe_trail = []
-                return True
-            # 重置滑动位置和轨迹
-            self.swipe_start_pos = None
-            self.swipe_end_pos = None
-            self.swipe_trail = []
-        return False
-
-    def draw_swipe_trail(self):
-        """绘制滑动轨迹"""
-        if len(self.swipe_trail) > 1:
-            pygame.draw.lines(self.screen, (255, 0, 0), False, self.swipe_trail, 3)
-
-    def play_video_and_audio(self, video_path, audio_path=None, swipe_scenes=None, pause_scenes=None):
-        """播放视频和音频"""
-        cap = cv2.VideoCapture(resource_path(video_path))
-        if not cap.isOpened():
+    @classmethod
+    def warm_text(cls, runtime):
+        """预先渲染本章剧情中已知的文字（所有章节共用缓存）。在标题画面的后台加载线程中调用，进入章节时不再同步渲染"""
+        story = load_story(resource_path("story.json"))
+        text_cache.warm_in_background(runtime.font_large, story.choice_texts, cls.choice_text_color)
+        text_cache.warm_in_background(runtime.font_large, story.title_texts, cls.text_color)
+        text_cache.warm_in_background(runtime.font_small, story.subtitle_texts, cls.text_color)
+        text_cache.warm_in_background(runtime.font_small, story.prompt_texts + list(cls.swipe_messages.values()),
+                                      cls.prompt_text_color)
+
+    def play_video_and_audio(self, video_path, audio_path=None, swipe_scenes=None, pause_scenes=None, next_clips=None,
+                             start_frame=0, on_trigger=None, skip=False, stop_audio=True):
+        """播放视频和音频（audio_path 为 None 时使用视频文件中的音轨），
+        next_clips 为之后可能播放的片段 [(video_path, audio_path), ...]，播放期间预取。
+        start_frame 不为 0 时借助关键帧索引从该帧开始播放，之前的触发点视为已完成。
+        on_trigger(frame) 在玩家完成触发点后调用，frame 为继续播放的帧号（用于保存进度）。
+        skip 为 True 时（已看过的片段）直接跳到下一个触发点，没有触发点的部分不播放。
+        stop_audio 为 False 时（之后紧接着播放下一个片段）结束时不停止音频，由下一个片段开始时直接切换，中间没有静音"""
+        upcoming = [(resource_path(v), resource_path(a) if a else None) for v, a in next_clips or []]
+        if skip:
+            # 定位到第一个尚未完成的触发点（帧率取自资源清单或关键帧索引），没有触发点时整段跳过
+            entry = self.runtime.manifest.get(resource_path(video_path))
+            index = self.runtime.keyframes.get(resource_path(video_path)) if entry is None else None
+            fps = entry["fps"] if entry is not None else index.fps if index is not None else None
+            if fps is not None:
+                pending = TriggerTable(fps, swipe_scenes, pause_scenes)
+                pending.reset(start_frame)
+                if pending.next_frame is None:
+                    self.prefetcher.prefetch(upcoming)
+                    if stop_audio:
+                        pygame.mixer.music.stop()
+                    return
+                start_frame = pending.next_frame
+
+        # 已预取时直接使用预先打开并预解码的片段
+        clip = self.prefetcher.take(resource_path(video_path), resource_path(audio_path) if audio_path else None,
+                                    start_frame)
+        if not clip.opened:
             print(f"无法打开视频文件: {video_path}")
+            clip.release()
             return
 
-        try:
-            if audio_path:
-                pygame.mixer.music.load(resource_path(audio_path))
-                pygame.mixer.music.play()
-        except pygame.error as e:
-            print(f"无法播放音频文件: {e}")
-            cap.release()
-            return
-
-        # 获取视频帧率
-        video_fps = cap.get(cv2.CAP_PROP_FPS)
-        if video_fps == 0:
-            video_fps = 30  # 默认帧率
-        frame_delay = 1 / video_fps
-
-        # 计算需要暂停等待点击的帧数
-        pause_frame_numbers = []
-        if pause_scenes:
-            for scene in pause_scenes:
-                frame_num = int(scene['time'] * video_fps)
-                pause_frame_numbers.append({'frame': frame_num, 'message': scene['message']})
-
-        # 计算需要滑动的帧数
-        swipe_frame_numbers = []
-        if swipe_scenes:
-            for scene in swipe_scenes:
-                frame_num = int(scene['time'] * video_fps)
-                swipe_frame_numbers.append({'frame': frame_num, 'direction': scene['direction']})
-
-        frame_count = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # 转换视频帧格式
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # 获取原始宽高比，保持视频比例
-            original_height, original_width, _ = frame.shape
-            aspect_ratio = original_width / original_height
-            target_width = self.screen_width
-            target_height = int(self.screen_width / aspect_ratio)
-
-            if target_height > self.screen_height:
-                target_height = self.screen_height
-                target_width = int(self.screen_height * aspect_ratio)
+        # 实际开始的帧号及对应的播放位置（秒）
+        start_frame = clip.decoder.start_index
+        start_time = start_frame / clip.fps
 
-            frame = cv2.resize(frame, (target_width, target_height))
+        # 音频已在预取时解码为 PCM，第一帧显示时才开始播放，音画同时开始
+        music = clip.music
+        audio_started = False
 
-            # 居中视频
-            self.x_offset = (self.screen_width - target_width) // 2
-            self.y_offset = (self.screen_height - target_height) // 2
+        # 预取后继片段（包括选择界面的所有分支），丢弃不再可能播放的片段
+        self.prefetcher.prefetch(upcoming)
 
-            # 将帧转换为 Pygame 的 Surface
-            frame_surface = pygame.surfarray.make_surface(frame)
-
-            # 添加旋转和翻转以修正视频方向
-            frame_surface = pygame.transform.rotate(frame_surface, -90)  # 旋转90度逆时针
-            frame_surface = pygame.transform.flip(frame_surface, True, False)  # 水平翻转
+        # 获取视频帧率
+        video_fps = clip.fps
+
+        # 编译本片段的触发表（提示文字预先确定）
+        triggers = TriggerTable(video_fps, swipe_scenes, pause_scenes, self.swipe_messages)
+        triggers.reset(start_frame)
+
+        # 后台线程解码，渲染循环只负责绘制
+        decoder = clip.decoder
+        layout = None  # 当前已绘制黑边的布局
+        repaint = True  # 需要重绘黑边并整屏刷新
+        # 以音频为主时钟同步画面，记录偏移和丢帧数（音频开始播放时换为音频时钟）
+        sync = AVSync(video_fps, PlaybackClock(use_audio=False, offset=start_time))
+        self.av_sync = sync
+        hud_rect = None  # 帧计时 HUD 所在区域
+        # 快进（Tab）跨片段保持，直到遇到触发点或选择
+        fast_forward = self.fast_forward
+        if fast_forward.active:
+            fast_forward.start(decoder, triggers.next_frame)
+        else:
+            fast_forward.cancel()
+        # 自适应画质：每帧耗时持续超出预算时降低画质，未启用时为 None
+        governor = self.runtime.governor
+        if governor:
+            governor.attach(decoder)
+        while True:
+            # 可选的分阶段计时，未启用时为 None
+            profiler = self.runtime.profiler
+            stages = profiler.render if profiler else None
+            if stages:
+                stages.begin()
+            if governor:
+                governor.begin()
+            decoded = decoder.get()
+            if stages:
+                stages.lap(GET)
+            if decoded is None:
+                break
+            if decoded.layout.screen_size != (self.screen_width, self.screen_height):
+                continue  # 内部分辨率或窗口刚变化，队列中按旧尺寸缩放的帧直接丢弃
+            frame_count = decoded.index
+            if not audio_started and not (fast_forward.active or fast_forward.draining):
+                # 显示第一帧前开始播放音频（从内存中的 PCM 按采样定位，没有解码延迟），以此刻作为主时钟起点
+                audio_started = True
+                offset = frame_count / video_fps
+                sync.clock = PlaybackClock(use_audio=music is not None and music.play_from(offset), offset=offset)
+
+            # 落后时丢弃该帧并让解码线程跳过后续帧，但不越过下一个触发点，保证触发帧准确
+            next_trigger = triggers.next_frame
+            if fast_forward.active or fast_forward.draining:
+                # 快进时按原帧率显示跳跃的帧；回到逐帧解码后音频定位到当前画面
+                if not fast_forward.pace(frame_count, video_fps):
+                    sync = self.av_sync = resync(video_fps, frame_count, music)
+                    audio_started = True
+            elif not sync.schedule(frame_count, next_trigger is None or frame_count < next_trigger):
+                skip_target = sync.target_frame()
+                decoder.skip_to(skip_target if next_trigger is None else min(skip_target, next_trigger))
+                if governor:
+                    governor.dropped()
+                continue
+            if stages:
+                stages.lap(SYNC)
+            frame_surface = decoded.surface
+
+            # 布局变化（新视频或窗口变化）时才绘制黑边并整屏刷新
+            full_update = repaint or decoded.layout is not layout
+            if full_update:
+                layout = decoded.layout
+                repaint = False
+                layout.paint_letterbox(self.screen, self.bg_color)
+                self.x_offset, self.y_offset = layout.position
+            if stages:
+                stages.lap(LETTERBOX)
 
             # 显示帧
-            self.last_frame_surface = frame_surface.copy()
-            self.screen.fill(self.bg_color)
-            self.screen.blit(frame_surface, (self.x_offset, self.y_offset))
-
-            for swipe_scene in swipe_frame_numbers:
-                if frame_count == swipe_scene['frame']:
-                    pygame.mixer.music.pause()
-                    direction = swipe_scene['direction']
-                    if direction == "left":
-                        swipe_message = "请向左滑动"
-                    elif direction == "left_hand":
-                        swipe_message = "请向左滑动牵起手"
-                    elif direction == "left_hug":
-                        swipe_message = "请向左滑动拥抱"
-                    elif direction == "right":
-                        swipe_message = "请向右滑动"
-                    elif direction == "down":
-                        swipe_message = "请向下滑动"
-                    elif direction == "up":
-                        swipe_message = "请向上滑动"
-                    elif direction == "left_down":
-                        swipe_message = "请向左下滑动"
+            self.last_frame_surface = frame_surface
+            self.screen.blit(frame_surface, layout.position)
+            if stages:
+                stages.lap(BLIT)
+
+            fired = triggers.due(frame_count)
+            if fired and fast_forward.active:
+                # 快进停在触发点，操作后音频定位到触发点之后继续
+                fast_forward.stop(decoder, frame_count, drain=False)
+            if fired:
+                sync.pause()
+                pause_music()
+                for trigger in fired:
+                    if trigger.kind == SWIPE:
+                        print(f"触发滑动场景: {trigger.message} at frame {frame_count}")  # Debug statement
+                        self.wait_for_swipe(trigger.direction, trigger.message)
                     else:
-                        swipe_message = "请滑动"
-
-                    print(f"触发滑动场景: {swipe_message} at frame {frame_count}")  # Debug statement
-                    self.wait_for_swipe(direction, swipe_message)
-                    pygame.mixer.music.unpause()
-
-            # 检查是否需要触发暂停
-            for pause_scene in pause_frame_numbers:
-                if frame_count == pause_scene['frame']:
-                    if pygame.mixer.music.get_busy():
-                        pygame.mixer.music.pause()
-                    pause_message = pause_scene['message']
-                    print(f"触发暂停场景: {pause_message} at frame {frame_count}")  # Debug statement
-                    self.wait_for_click(pause_message)
-                    pygame.mixer.music.unpause()
-
-            pygame.display.update()
-            self.clock.tick(video_fps)
-            frame_count += 1
+                        print(f"触发暂停场景: {trigger.message} at frame {frame_count}")  # Debug statement
+                        self.wait_for_click(trigger.message)
+                # 暂停时音频已停止，从触发点之后重新播放
+                sync = self.av_sync = resync(video_fps, frame_count + 1, music)
+                audio_started = True
+                repaint = True  # 提示文字和滑动轨迹可能覆盖黑边，恢复播放时重绘
+                if stages:
+                    stages.skip()  # 等待玩家操作的时间不计入
+            if fired and on_trigger:
+                on_trigger(frame_count + 1)
+            if fired and skip:
+                # 已看过的片段：只 grab 到下一个触发点，之后没有触发点时结束本片段
+                if triggers.next_frame is None:
+                    break
+                fast_forward.start(decoder, triggers.next_frame, step=triggers.next_frame + 1)
+
+            if profiler and profiler.hud_visible:
+                hud_rect = profiler.draw_hud(self.screen, self.font_small, sync.drift, decoder.depth(),
+                                             governor.label if governor else None)
+                if stages:
+                    stages.lap(HUD)
+
+            # 只刷新视频区域
+            if full_update:
+                pygame.display.update()
+            elif hud_rect:
+                pygame.display.update([layout.rect, hud_rect])
+            else:
+                pygame.display.update(layout.rect)
+            if stages:
+                stages.lap(UPDATE)
 
             # 检测退出事件
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    cap.release()
+                    decoder.stop()
                     pygame.quit()
                     sys.exit()
-
-        cap.release()
-        pygame.mixer.music.stop()
+                elif event.type == pygame.VIDEORESIZE:
+                    # 窗口尺寸变化：按新尺寸重新计算布局
+                    self.runtime.resize_screen()
+                    decoder.resize_screen(self.screen_width, self.screen_height)
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    # 显示或隐藏帧计时 HUD，隐藏时重绘被覆盖的区域
+                    if not self.runtime.toggle_hud().hud_visible:
+                        hud_rect = None
+                        repaint = True
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_TAB:
+                    # 开始或结束快进
+                    if fast_forward.active:
+                        fast_forward.stop(decoder, frame_count)
+                    else:
+                        fast_forward.start(decoder, triggers.next_frame)
+            if governor and not fired and not (fast_forward.active or fast_forward.draining):
+                if governor.end(video_fps, sync.waited, triggers.next_frame):
+                    # 内部分辨率变化：按新尺寸重新布局，预取的片段也按新尺寸重新打开
+                    decoder.resize_screen(self.screen_width, self.screen_height)
+                    self.prefetcher.prefetch(upcoming)
+                    repaint = True
+            if stages:
+                stages.lap(EVENTS)
+                stages.end()
+
+        decoder.stop()
+        profiler = self.runtime.profiler
+        if profiler and sync.clock.start_latency is not None:
+            profiler.record_audio_start(sync.clock.start_latency)
+        if stop_audio:
+            pygame.mixer.music.stop()
 
     def wait_for_swipe(self, direction, message):
-        """等待滑动操作"""
-        waiting = True
-        self.swipe_trail = []  # 开始等待时重置滑动轨迹
-        while waiting:
-            for event in pygame.event.get():
+        """等待滑动操作：阻塞等待输入事件，只重绘滑动轨迹和提示文字所在的区域"""
+        self.gestures.reset()  # 开始等待时重置滑动轨迹
+        prompt_text = text_cache.render(self.font_small, message, self.prompt_text_color)
+        prompt_rect = prompt_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
+        view = PausedFrameView(self.screen, self.bg_color, self.last_frame_surface, (self.x_offset, self.y_offset))
+        view.show([(prompt_text, prompt_rect)])
+
+        while True:
+            dirty = []
+            for event in wait_events():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
-                elif self.detect_swipe(event, direction):
+                elif self.gestures.feed(event, direction):
                     print(f"检测到滑动方向: {direction}")  # Debug statement
-                    waiting = False
-
-            if self.last_frame_surface:
-                # 使用存储的偏移量绘制视频帧
-                self.screen.blit(self.last_frame_surface, (self.x_offset, self.y_offset))
-            self.draw_swipe_trail()  # 绘制滑动轨迹
-            prompt_text = self.font_small.render(message, True, self.prompt_text_color)
-            prompt_rect = prompt_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
-            self.screen.blit(prompt_text, prompt_rect)
-            pygame.display.flip()
-            self.clock.tick(60)  # 在等待时以合理的帧率运行
+                    return
+                view.update_trail(self.gestures, dirty)  # 增量绘制滑动轨迹
+            if dirty:
+                pygame.display.update(dirty)
 
     def wait_for_click(self, message):
-        """等待鼠标点击操作"""
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    waiting = False
-
-            if self.last_frame_surface:
-                # 使用存储的偏移量绘制视频帧
-                self.screen.blit(self.last_frame_surface, (self.x_offset, self.y_offset))
-
-            # 渲染暂停消息
-            prompt_text = self.font_small.render(message, True, self.prompt_text_color)
-            prompt_rect = prompt_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
-            self.screen.blit(prompt_text, prompt_rect)
-
-            pygame.display.flip()
-            self.clock.tick(60)  # 保持合理的帧率
+        """等待鼠标点击操作：画面只绘制一次，之后阻塞等待点击"""
+        prompt_text = text_cache.render(self.font_small, message, self.prompt_text_color)
+        prompt_rect = prompt_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
+        view = PausedFrameView(self.screen, self.bg_color, self.last_frame_surface, (self.x_offset, self.y_offset))
+        view.show([(prompt_text, prompt_rect)])
+
+        with ignore_motion():
+            while True:
+                for event in wait_events():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        return
 
     def display_choices(self, choices):
         """显示选择界面，背景为暂停的视频帧"""
-        rendered_choices = [self.font_large.render(choice, True, self.choice_text_color) for choice in choices]
+        self.fast_forward.cancel()  # 快进停在选择界面
+        rendered_choices = [text_cache.render(self.font_large, choice, self.choice_text_color) for choice in choices]
         # 增大按钮之间的垂直间距，例如150像素
         choice_rects = [text.get_rect(center=(self.screen_width // 2, 200 + i * 150)) for i, text in
                         enumerate(rendered_choices)]
@@ -292,155 +303,57 @@ class Game:
         # 清空事件队列，确保没有残留事件
         pygame.event.clear()
 
-        while True:
-            if self.last_frame_surface:
-                # 使用存储的偏移量绘制视频帧
-                self.screen.blit(self.last_frame_surface, (self.x_offset, self.y_offset))
-            for text, rect in zip(rendered_choices, choice_rects):
-                self.screen.blit(text, rect)
-            pygame.display.flip()
-
-            # 等待新的事件
-            event = pygame.event.wait()
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = event.pos
-                for i, rect in enumerate(choice_rects):
-                    if rect.collidepoint(mouse_pos):
-                        print(f"选择了: {choices[i]}")  # Debug statement
-                        return choices[i]
+        # 画面不会变化，只绘制一次
+        view = PausedFrameView(self.screen, self.bg_color, self.last_frame_surface, (self.x_offset, self.y_offset))
+        view.show(zip(rendered_choices, choice_rects))
+
+        with ignore_motion():
+            while True:
+                # 等待新的事件
+                for event in wait_events():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        mouse_pos = event.pos
+                        for i, rect in enumerate(choice_rects):
+                            if rect.collidepoint(mouse_pos):
+                                print(f"选择了: {choices[i]}")  # Debug statement
+                                return choices[i]
 
     def show_text_screen(self, title, subtitle):
         """显示黑屏文本"""
         self.screen.fill(self.bg_color)
-        title_text = self.font_large.render(title, True, self.text_color)
-        subtitle_text = self.font_small.render(subtitle, True, self.text_color)
+        title_text = text_cache.render(self.font_large, title, self.text_color)
+        subtitle_text = text_cache.render(self.font_small, subtitle, self.text_color)
         self.screen.blit(title_text, ((self.screen_width - title_text.get_width()) // 2, self.screen_height // 3))
         self.screen.blit(subtitle_text, ((self.screen_width - subtitle_text.get_width()) // 2, self.screen_height // 2))
         pygame.display.flip()
 
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    waiting = False
-            self.clock.tick(60)
-    def chapter_two(self):
-        """第二章逻辑"""
-        self.play_video_and_audio(
-            "res/小时候结识.mp4",
-            "res/小时候结识.mp3",
-            swipe_scenes=[
-                {'time':16, 'direction':'right'},
-                {'time':22, 'direction':'down'},
-                {'time':77, 'direction':'left_hand'},
-                {'time':80, 'direction':'up'}
-            ]
-        )
-        self.play_video_and_audio("res/给明里写信.mp4", "res/给明里写信.mp3")
-        # 显示选择界面，用户进行选择
-        choice = self.display_choices(["不再联系", "表达转学", "隐瞒转学"])
-        # 根据用户选择进行不同的分支
-        if choice == "不再联系":
-            self.play_video_and_audio("res/好久没联系了.mp4", "res/好久没联系了.mp3")
-            self.show_text_screen("成就达成", "花开花落终有时，相逢相聚本无意")
-        elif choice == "表达转学":
-            self.play_video_and_audio("res/突然转学.mp4", "res/突然转学.mp3")
-            choice2 = self.display_choices(["写信沟通", "不再联系"])
-            if choice2 == "写信沟通":
-                self.play_video_and_audio("res/再次写给明里.mp4", "res/再次写给明里.mp3")
-                self.play_video_and_audio("res/天冷最近还好吗.mp4", "res/天冷最近还好吗.mp3")
-                self.play_video_and_audio(
-                    "res/让你来我这边车站.mp4",
-                    "res/让你来我这边车站.mp3",
-                    swipe_scenes=[
-                        {'time': 6, 'direction': 'left_down'}
-                    ]
-                )
-                self.play_video_and_audio(
-                    "res/晚点.mp4",
-                    "res/晚点.mp3",
-                    pause_scenes=[
-                        {'time': 124, 'message': "点击屏幕关闭车门"}
-                    ]
-                )
-                self.play_video_and_audio("res/下车要见明里了.mp4", "res/下车要见明里了.mp3",swipe_scenes=[
-                        {'time': 5, 'direction': 'up'}
-                    ],pause_scenes=[
-                    {'time': 24, 'message': "点击镜子审视"}
-    ])
-                self.play_video_and_audio("res/再次晚点.mp4", "res/再次晚点.mp3",
-                swipe_scenes=[
-                    {'time': 36, 'direction': 'down'}
-                ])
-                self.play_video_and_audio("res/火车终于等到明里.mp4", "res/火车终于等到明里.mp3",
-                                          swipe_scenes=[
-                                              {'time': 78, 'direction': 'left'},
-                                              {'time': 93, 'direction': 'right'},
-                                              {'time': 214, 'direction': 'up'},
-                                              {'time': 338, 'direction': 'left_hug'}
-                                          ], pause_scenes=[
-                        {'time': 99, 'message': "点击叫明里名字"}
-                    ])
-                self.show_text_screen("第二章", "宇航员")
-                new_game = Game(screen_width, screen_height)
-                new_game.chapter_three()
-                new_game = Main3Game(self.screen_width, self.screen_height)
-                new_game.chapter_three()
-            elif choice2 == "不再联系":
-                self.play_video_and_audio("res/一年没见.mp4", "res/一年没见.mp3")
-                self.show_text_screen("成就达成", "渐行渐远渐无书，水阔鱼沉何处问")
-                new_game = Main3Game(self.screen_width, self.screen_height)
-                new_game.chapter_three()
-
-        elif choice == "隐瞒转学":
-            self.play_video_and_audio("res/谢谢你的回信.mp4", "res/谢谢你的回信.mp3")
-            self.play_video_and_audio(
-                "res/让你来我这边车站.mp4",
-                "res/让你来我这边车站.mp3",
-                swipe_scenes=[
-                    {'time': 6, 'direction': 'left_down'}
-                ]
-            )
-            self.play_video_and_audio("res/晚点.mp4","res/晚点.mp3",
-                pause_scenes=[
-                    {'time': 124, 'message': "点击关上车门"}
-                ]
-            )
-            self.play_video_and_audio("res/下车要见明里了.mp4", "res/下车要见明里了.mp3",swipe_scenes=[
-                        {'time': 5, 'direction': 'up'}
-                    ],pause_scenes=[
-        {'time': 24, 'message': "点击镜子审视"}
-    ])
-            self.play_video_and_audio("res/再次晚点.mp4", "res/再次晚点.mp3",
-                swipe_scenes=[
-                    {'time': 36, 'direction': 'down'}
-                ])
-            self.play_video_and_audio("res/火车终于等到明里.mp4", "res/火车终于等到明里.mp3",
-                swipe_scenes=[
-                    {'time': 78, 'direction': 'left'},
-                    {'time': 93, 'direction': 'right'},
-                    {'time': 214, 'direction': 'up'},
-                    {'time': 338, 'direction': 'left_hug'}
-                ],pause_scenes=[
-        {'time': 99, 'message': "点击叫明里名字"}
-    ])
-            self.show_text_screen("第二章", "宇航员")
-            new_game = Main3Game(self.screen_width, self.screen_height)
-            new_game.chapter_three()
+        with ignore_motion():
+            while True:
+                for event in wait_events():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        return
+
+    def chapter_two(self, start_node=None, start_frame=0):
+        """第二章逻辑，剧情由 story.json 描述；继续游戏时从 start_node 节点视频的第 start_frame 帧开始"""
+        run_story(self, self.story, "chapter_two", start_node, start_frame, self.runtime.checkpoints,
+                  self.runtime.skip_seen)
 
         pygame.quit()
         sys.exit()
 
+    def enter_chapter(self, chapter):
+        """剧情进入下一章节"""
+        if chapter == "chapter_three":
+            from main3 import Game as Main3Game
+            new_game = Main3Game(runtime=self.runtime)
+            new_game.chapter_three()
+
 if __name__ == "__main__":
-    pygame.init()
-    infoObject = pygame.display.Info()
-    screen_width = int(infoObject.current_w)
-    screen_height = int(infoObject.current_h)
-    game = Game(screen_width, screen_height)
+    game = Game()
     game.chapter_two()
@@ -0,0 +1,108 @@
+"""离线合并音视频：把每个片段的 mp4 和同名的 mp3 合并为一个 mp4（视频和音频都直接复制，不重新编码），
+播放时从视频文件中读取音轨，每个片段只打开、读取一个文件。需要本地的 ffmpeg（见 audio_cache.ffmpeg_path）。
+
+用法：
+    python mux_assets.py                   # 合并 story.json 和第一章用到的所有片段，原 mp4 被替换
+    python mux_assets.py --update-story    # 同时从 story.json 中删除已合并片段的 audio 字段
+    python mux_assets.py --dry-run         # 只列出要合并的片段
+
+合并完成后 res/ 下的 mp3 不再被读取，可以删除（第一章的 chapter_one.mp3 删除后才会改用视频中的音轨）。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from audio_cache import ffmpeg_path
+
+STORY_PATH = "story.json"
+CHAPTER_ONE = ("res/chapter_one.mp4", "res/chapter_one.mp3")
+
+
+def asset_pairs(story):
+    """剧情和第一章用到的 (视频, 音频) 对，去重并保持出现顺序"""
+    pairs = [CHAPTER_ONE]
+    for node in story["nodes"].values():
+        if node.get("type") == "clip" and node.get("audio"):
+            pairs.append((node["video"], node["audio"]))
+    return list(dict.fromkeys(pairs))
+
+
+def has_audio(executable, video_path):
+    """视频文件中是否已有音轨"""
+    result = subprocess.run([executable, "-v", "error", "-nostdin", "-i", video_path, "-map", "0:a:0", "-t", "0",
+                             "-f", "null", "-"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def mux(executable, video_path, audio_path):
+    """把 audio_path 作为音轨写入 video_path（先写临时文件再替换），返回是否成功"""
+    root, ext = os.path.splitext(video_path)
+    tmp_path = root + ".muxing" + ext
+    command = [executable, "-v", "error", "-nostdin", "-y", "-i", video_path, "-i", audio_path,
+               "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", "-movflags", "+faststart", tmp_path]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        print(f"合并失败 {video_path}: {message[-1] if message else result.returncode}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, video_path)
+    return True
+
+
+def write_story(story, path):
+    """按原有格式（每个节点一行）写回剧情文件"""
+    lines = [f"    {json.dumps(name, ensure_ascii=False)}: {json.dumps(node, ensure_ascii=False)}"
+             for name, node in story["nodes"].items()]
+    text = ("{\n  \"starts\": " + json.dumps(story["starts"], ensure_ascii=False) + ",\n  \"nodes\": {\n"
+            + ",\n".join(lines) + "\n  }\n}\n")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把片段的 mp3 合并进同名 mp4")
+    parser.add_argument("--story", default=STORY_PATH, help="剧情文件")
+    parser.add_argument("--update-story", action="store_true", help="从剧情文件中删除已合并片段的 audio 字段")
+    parser.add_argument("--dry-run", action="store_true", help="只列出要合并的片段")
+    args = parser.parse_args()
+
+    executable = ffmpeg_path()
+    if executable is None:
+        print("找不到 ffmpeg（可设置环境变量 FFMPEG_BINARY）")
+        sys.exit(1)
+    with open(args.story, encoding="utf-8") as f:
+        story = json.load(f)
+
+    muxed = set()
+    for video_path, audio_path in asset_pairs(story):
+        if not os.path.isfile(video_path):
+            print(f"视频文件不存在: {video_path}")
+            continue
+        if has_audio(executable, video_path):
+            print(f"已包含音轨: {video_path}")
+            muxed.add(video_path)
+            continue
+        if not os.path.isfile(audio_path):
+            print(f"音频文件不存在: {audio_path}")
+            continue
+        if args.dry_run:
+            print(f"将合并: {video_path} + {audio_path}")
+            continue
+        if mux(executable, video_path, audio_path):
+            print(f"已合并: {video_path} + {audio_path}")
+            muxed.add(video_path)
+
+    if args.update_story and not args.dry_run:
+        for node in story["nodes"].values():
+            if node.get("type") == "clip" and node.get("video") in muxed:
+                node.pop("audio", None)
+        write_story(story, args.story)
+        print(f"已更新 {args.story}")
+
+
+if __name__ == "__main__":
+    main()
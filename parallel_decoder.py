@@ -0,0 +1,362 @@
+"""多进程分段解码（可选）：按关键帧把视频切成若干段，进程池中的多个进程并行解码、缩放各段，
+写入共享内存中的帧环形缓冲区；渲染进程直接以共享内存作为 Surface 的像素，不再复制。
+
+4K 等高分辨率视频单线程 read + 缩放跟不上帧率时使用，不受 GIL 限制，解码能力随进程数（核数）增加。
+设置环境变量 PARALLEL_DECODE 启用：值为工作进程数，auto 为 CPU 核数减 1；
+PARALLEL_DECODE_MIN_HEIGHT 为启用的最小视频高度（默认 1440），较小的视频仍由 FrameDecoder 解码。
+关键帧越密，分段越短，需要的共享内存越少（见 keyframe_index.py 的输出）。
+"""
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+import pygame
+
+from asset_pack import open_video
+from video_decoder import DecodedFrame, VideoLayout
+
+# 共享内存开头的计数器：[停止标记, 通道 0 已写入帧数, 通道 0 已读取帧数, 通道 1 已写入帧数, ...]
+STOP = 0
+
+
+def _written(lane):
+    return 1 + 2 * lane
+
+
+def _read(lane):
+    return 2 + 2 * lane
+
+
+def _views(buf, lanes, ring_frames, target_size):
+    """共享内存的三部分：计数器、每个槽位的帧号（-1 为结束标记）、各通道的帧环形缓冲区"""
+    width, height = target_size
+    counters = np.ndarray((1 + 2 * lanes,), np.int64, buf)
+    meta = np.ndarray((lanes, ring_frames), np.int64, buf, counters.nbytes)
+    offset = (counters.nbytes + meta.nbytes + 63) // 64 * 64
+    frames = np.ndarray((lanes, ring_frames, height, width, 3), np.uint8, buf, offset)
+    return counters, meta, frames
+
+
+def _block_size(lanes, ring_frames, target_size):
+    width, height = target_size
+    header = (8 * (1 + 2 * lanes) + 8 * lanes * ring_frames + 63) // 64 * 64
+    return header + lanes * ring_frames * height * width * 3
+
+
+def _wait_slot(counters, lane, ring_frames):
+    """等待通道中有空闲槽位；收到停止标记时返回 False"""
+    while counters[_written(lane)] - counters[_read(lane)] >= ring_frames:
+        if counters[STOP]:
+            return False
+        time.sleep(0.001)
+    return not counters[STOP]
+
+
+def warm_up():
+    """工作进程启动后先导入模块，第一个片段不必等待"""
+    return os.getpid()
+
+
+def decode_lane(shm_name, lanes, lane, ring_frames, target_size, video_path, segments, interpolation=cv2.INTER_LINEAR):
+    """工作进程：依次解码本通道负责的段（第 lane、lane + lanes、... 段），缩放后写入共享内存。
+    segments 的每一项为 (定位的关键帧, 第一帧, 结束帧)，最后一段的结束帧为 None（读到视频结束）"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    counters, meta, frames = _views(shm.buf, lanes, ring_frames, target_size)
+    cap = open_video(video_path)
+    target_size = tuple(target_size)
+    # 视频尺寸与目标一致时直接解码进共享内存
+    direct = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))) == target_size
+    raw = None
+    try:
+        position = 0
+        for seek_frame, first, end in segments[lane::lanes]:
+            # 定位到段起点的关键帧，再只 grab 到第一帧
+            if seek_frame != position:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, seek_frame)
+                position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+                if position != seek_frame:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    position = 0
+            while position < first and cap.grab():
+                position += 1
+            index = first
+            while end is None or index < end:
+                if not _wait_slot(counters, lane, ring_frames):
+                    return
+                slot = counters[_written(lane)] % ring_frames
+                buffer = frames[lane, slot]
+                if direct:
+                    ret, _ = cap.read(buffer)
+                else:
+                    ret, raw = cap.read(raw)
+                if not ret:
+                    break
+                position += 1
+                if not direct:
+                    cv2.resize(raw, target_size, dst=buffer, interpolation=interpolation)
+                meta[lane, slot] = index
+                counters[_written(lane)] += 1
+                index += 1
+            if end is None or index < end:
+                # 视频结束（或比索引记录的短）：写入结束标记
+                if _wait_slot(counters, lane, ring_frames):
+                    meta[lane, counters[_written(lane)] % ring_frames] = -1
+                    counters[_written(lane)] += 1
+                return
+    finally:
+        cap.release()
+        del counters, meta, frames
+        shm.close()
+
+
+class ParallelDecoder:
+    """多进程分段解码，接口与 FrameDecoder 一致（get、skip_to、fast_forward、resize_screen、depth、stop）。
+    解码在其他进程中进行，不写入帧缓存，也没有解码线程的分阶段计时"""
+
+    def __init__(self, pool, video_path, index, frame_size, screen_width, screen_height, start_index=0,
+                 prefetch_limit=None):
+        self.pool = pool
+        self.video_path = video_path
+        self.index = index  # 关键帧索引，用于分段
+        self.frame_size = frame_size
+        self.screen_size = (screen_width, screen_height)
+        self.start_index = start_index  # 第一帧的帧号
+        self.prefetch_limit = prefetch_limit  # 不为 None 时（预取）等到开始播放才启动解码
+        self.layout = None
+        self.finished = False
+        self.skipped_frames = 0
+        self.step = 1
+        self.step_limit = None
+        self.interpolation = cv2.INTER_LINEAR  # 工作进程的缩放插值方式，下一次分段时生效
+        self._skip_target = 0
+        self._next_index = start_index  # 下一帧的帧号
+        self._pending_screen_size = None
+        self._shm = None
+        self._results = []
+        self._held = None  # 正在显示的帧所在的通道，取下一帧时才释放槽位
+
+    def start(self):
+        if self.prefetch_limit is None:
+            self.release_limit()
+        return self
+
+    def _launch(self, start):
+        """从第 start 帧开始分段，各通道交给进程池并行解码"""
+        self._shutdown()
+        self.layout = VideoLayout(*self.frame_size, *self.screen_size)
+        target_size = self.layout.target_size
+        self._segments = self.pool.segments(self.index, start)
+        self._segment = 0
+        self._lanes = min(self.pool.workers, len(self._segments))
+        self._ring_frames = self.pool.ring_frames(self.index, self._segments, target_size, self._lanes)
+        self._shm = shared_memory.SharedMemory(create=True,
+                                               size=_block_size(self._lanes, self._ring_frames, target_size))
+        self._counters, self._meta, frames = _views(self._shm.buf, self._lanes, self._ring_frames, target_size)
+        self._counters[:] = 0
+        # Surface 直接引用共享内存，按 BGR 解释
+        self._surfaces = [[pygame.image.frombuffer(frames[lane, slot], target_size, "BGR")
+                           for slot in range(self._ring_frames)] for lane in range(self._lanes)]
+        self._next_index = start
+        self._results = [self.pool.submit(decode_lane, self._shm.name, self._lanes, lane, self._ring_frames,
+                                          target_size, self.video_path, self._segments, self.interpolation)
+                         for lane in range(self._lanes)]
+
+    def _wait_frame(self, lane):
+        """等待通道中有已解码的帧；工作进程已退出（出错或被停止）时返回 False"""
+        counters = self._counters
+        while counters[_written(lane)] <= counters[_read(lane)]:
+            result = self._results[lane]
+            if result.ready():
+                if counters[_written(lane)] > counters[_read(lane)]:
+                    return True
+                if not result.successful():
+                    try:
+                        result.get()
+                    except Exception as e:
+                        print(f"并行解码失败: {e}")
+                return False
+            time.sleep(0.0005)
+        return True
+
+    def _release_held(self):
+        if self._held is not None:
+            self._counters[_read(self._held)] += 1
+            self._held = None
+
+    def get(self):
+        """取出下一帧（按帧号顺序），视频结束时返回 None"""
+        if self.finished:
+            return None
+        if self._pending_screen_size is not None:
+            self.screen_size, self._pending_screen_size = self._pending_screen_size, None
+            self._launch(self._next_index)
+        elif self._shm is None:
+            self._launch(self._next_index)
+        self._release_held()
+        while True:
+            end = self._segments[self._segment][2]
+            target = self._skip_target
+            if target - self._next_index > self._ring_frames and (end is None or target >= end):
+                # 跳得较远（快进、落后）：从目标帧重新分段，不再等待各进程解码会被跳过的帧
+                self.skipped_frames += target - self._next_index
+                self._launch(target)
+                continue
+            lane = self._segment % self._lanes
+            if not self._wait_frame(lane):
+                self.finished = True
+                return None
+            slot = self._counters[_read(lane)] % self._ring_frames
+            index = int(self._meta[lane, slot])
+            if index < 0:
+                self._counters[_read(lane)] += 1
+                self.finished = True
+                return None
+            if end is not None and index + 1 >= end:
+                self._segment += 1
+            self._next_index = index + 1
+            if index < target:
+                self._counters[_read(lane)] += 1
+                self.skipped_frames += 1
+                continue
+            self._held = lane
+            if self.step > 1:
+                self.skip_to(index + self.step if self.step_limit is None else min(index + self.step, self.step_limit))
+            return DecodedFrame(index, self._surfaces[lane][slot], self.layout)
+
+    def skip_to(self, index):
+        """跳过 index 之前的帧（已解码的直接丢弃，较远时从 index 重新分段）"""
+        if index > self._skip_target:
+            self._skip_target = index
+
+    def fast_forward(self, step, limit=None):
+        """快进：每 step 帧只取一帧，不越过 limit；step 为 1 时恢复逐帧"""
+        self.step_limit = limit
+        self.step = max(1, int(step))
+
+    def release_limit(self):
+        """开始正式播放：预取时推迟的解码现在启动，并等到第一帧解码完成（与 FrameDecoder 打开时定位的耗时相当），
+        之后开始的音画同步时钟不会因为工作进程定位而落后"""
+        if self._shm is None and not self.finished:
+            self._launch(self._next_index)
+            self._wait_frame(0)
+
+    def resize_screen(self, screen_width, screen_height):
+        """窗口尺寸变化：下一帧起按新布局重新分段解码"""
+        self._pending_screen_size = (screen_width, screen_height)
+
+    def set_interpolation(self, interpolation):
+        """缩放插值方式（cv2.INTER_*）：已分给工作进程的段不变，下一次分段（定位、跳帧较远、窗口变化）时生效"""
+        self.interpolation = interpolation
+
+    def depth(self):
+        """已解码、尚未取出的帧数"""
+        if self._shm is None:
+            return 0
+        return int(sum(self._counters[_written(lane)] - self._counters[_read(lane)] for lane in range(self._lanes)))
+
+    def _shutdown(self):
+        if self._shm is None:
+            return
+        self._counters[STOP] = 1  # 通知工作进程退出
+        deadline = time.perf_counter() + 2.0
+        for result in self._results:
+            result.wait(max(0.0, deadline - time.perf_counter()))
+        self._results = []
+        self._held = None
+        self._surfaces = None
+        self._counters = self._meta = None
+        self.pool.retire(self._shm)
+        self._shm = None
+
+    def stop(self):
+        """停止各通道的解码并释放共享内存（仍在显示的最后一帧在其 Surface 释放前保持有效）"""
+        self._shutdown()
+
+
+class ParallelDecodePool:
+    """并行解码的进程池（所有片段共用，创建时即在后台启动工作进程）及分段参数"""
+
+    def __init__(self, workers, min_height=1440, segment_seconds=1.0, max_bytes=1024 ** 3):
+        self.workers = max(1, int(workers))
+        self.min_height = min_height
+        self.segment_seconds = segment_seconds  # 每段的最短时长，相邻的短 GOP 合并为一段
+        self.max_bytes = max_bytes  # 共享内存环形缓冲区的总大小上限
+        self._retired = []  # 最后一帧的 Surface 仍在使用、暂时不能关闭的共享内存
+        # spawn 方式启动：不复制父进程的窗口和线程状态，各平台行为一致
+        self._pool = multiprocessing.get_context("spawn").Pool(self.workers)
+        for _ in range(self.workers):
+            self._pool.apply_async(warm_up)
+
+    @classmethod
+    def from_env(cls):
+        """设置环境变量 PARALLEL_DECODE 时启用：值为工作进程数，auto 为 CPU 核数减 1；否则返回 None"""
+        value = os.environ.get("PARALLEL_DECODE", "").strip().lower()
+        if not value or value == "0":
+            return None
+        if value == "auto":
+            workers = max(2, (os.cpu_count() or 2) - 1)
+        else:
+            try:
+                workers = int(value)
+            except ValueError:
+                print(f"PARALLEL_DECODE 的值无效: {value}")
+                return None
+        try:
+            min_height = int(os.environ.get("PARALLEL_DECODE_MIN_HEIGHT", "1440"))
+        except ValueError:
+            min_height = 1440
+        return cls(workers, min_height)
+
+    def submit(self, func, *args):
+        return self._pool.apply_async(func, args)
+
+    def segments(self, index, start):
+        """从第 start 帧开始按关键帧切分为 [(定位的关键帧, 第一帧, 结束帧), ...]，最后一段的结束帧为 None"""
+        min_frames = max(1, int(index.fps * self.segment_seconds))
+        seek_frame = index.keyframe_before(start)
+        first = start
+        segments = []
+        for keyframe in index.frames:
+            if keyframe - first >= min_frames:
+                segments.append((seek_frame, first, keyframe))
+                seek_frame = first = keyframe
+        segments.append((seek_frame, first, None))
+        return segments
+
+    def ring_frames(self, index, segments, target_size, lanes):
+        """每个通道的槽位数：能容纳最长的一段（并行的前提），受 max_bytes 限制"""
+        longest = max((end if end is not None else index.frame_count) - first for _, first, end in segments)
+        frame_bytes = target_size[0] * target_size[1] * 3
+        return max(4, min(longest, self.max_bytes // (frame_bytes * lanes)))
+
+    def open(self, cap, video_path, keyframes, screen_width, screen_height, start_frame=0, prefetch_limit=None):
+        """视频高度达到 min_height 且有关键帧信息时返回 ParallelDecoder 并释放 cap（各进程自行打开视频），
+        否则返回 None，由调用方继续用 cap 创建 FrameDecoder"""
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if keyframes is None or frame_size[1] < self.min_height:
+            return None
+        index = keyframes.get(video_path)
+        if index is None or not index.exact or index.frame_count <= 0:
+            return None
+        cap.release()
+        start_frame = min(max(0, start_frame), index.frame_count - 1)
+        return ParallelDecoder(self, video_path, index, frame_size, screen_width, screen_height, start_frame,
+                               prefetch_limit)
+
+    def retire(self, shm):
+        """释放共享内存：先删除名字，映射在最后一帧的 Surface 释放后再关闭"""
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._retired.append(shm)
+        still_used = []
+        for block in self._retired:
+            try:
+                block.close()
+            except BufferError:
+                still_used.append(block)
+        self._retired = still_used
@@ -0,0 +1,147 @@
+"""自适应画质：播放循环每帧报告实际的工作耗时（不含音画同步的等待），平均耗时持续超出帧预算时逐级降低画质，
+余量恢复后再逐级恢复。降级后很快又要降回去时，下次恢复前等待的帧数加倍（迟滞），避免画质来回切换。
+
+等级：
+    0 原画质
+    1 缩放改用最近邻插值
+    2 以窗口一半的内部分辨率渲染，由 SDL 硬件缩放到窗口（pygame.SCALED）
+    3 跳帧：每两帧只解码、显示一帧（不越过触发点）
+当前环境无法切换到某一等级（例如无法创建 SCALED 渲染器）时跳过该等级。
+默认最多降到等级 1（只改变缩放插值，不切换显示模式）；设置环境变量 QUALITY_GOVERNOR 为 2～3 时允许降到该等级
+（等级 2 会在运行中切换窗口的显示模式），为 0 时关闭。
+"""
+import os
+import time
+
+import cv2
+
+LEVEL_NAMES = ("原画质", "最近邻缩放", "半分辨率渲染", "跳帧")
+LEVEL_LABELS = ("full", "nearest", "half-res", "skip")  # HUD 中显示的简称
+MAX_LEVEL = len(LEVEL_NAMES) - 1
+NEAREST, HALF_RES, FRAME_SKIP = 1, 2, 3
+
+
+class QualityGovernor:
+    """播放循环中的画质调节：begin() 开始一帧，丢帧时 dropped()，显示后 end()；
+    attach() 把当前等级应用到新片段的解码器"""
+
+    def __init__(self, runtime, max_level=MAX_LEVEL, high=0.9, low=0.5, down_frames=30, up_frames=180,
+                 render_scale=0.5):
+        self.runtime = runtime
+        self.max_level = max_level
+        self.high = high  # 平均耗时超过帧预算的该比例时视为超出
+        self.low = low  # 低于该比例时视为有余量
+        self.down_frames = down_frames  # 连续超出这么多帧后降一级
+        self.up_frames = up_frames  # 连续有余量这么多帧后升一级（降级后很快又降回时加倍）
+        self.render_scale = render_scale  # 等级 2 的内部分辨率比例
+        self.level = 0
+        self.unavailable = set()  # 当前环境无法切换到的等级
+        self.average = 0.0  # 每帧耗时与帧预算之比的指数移动平均
+        self.profiler = None  # 可选的分阶段计时，等级变化记录在其中
+        self.changes = []  # [(时刻, 等级, 平均耗时比例)]
+        self._up_wait = up_frames
+        self._over = 0
+        self._under = 0
+        self._frames = 0  # 已统计的帧数
+        self._last_up = None  # 最近一次升级时的帧数
+        self._frame_start = 0.0
+        self._decoder = None
+        self._resized = False  # 内部分辨率已变化，end() 时通知调用方
+
+    @classmethod
+    def from_env(cls, runtime):
+        value = os.environ.get("QUALITY_GOVERNOR")
+        if value == "0":
+            return None
+        if value and value.isdigit():
+            return cls(runtime, max_level=min(int(value), MAX_LEVEL))
+        return cls(runtime, max_level=NEAREST)
+
+    @property
+    def interpolation(self):
+        return cv2.INTER_NEAREST if self.level >= NEAREST else cv2.INTER_LINEAR
+
+    @property
+    def frame_step(self):
+        return 2 if self.level >= FRAME_SKIP else 1
+
+    @property
+    def label(self):
+        return f"{self.level} {LEVEL_LABELS[self.level]}"
+
+    def attach(self, decoder):
+        """开始播放一个片段：应用当前的缩放插值，重新开始统计（开头几帧常有打开、定位的开销）"""
+        self._decoder = decoder
+        decoder.set_interpolation(self.interpolation)
+        self._over = self._under = 0
+        self.average = 0.0
+
+    def begin(self):
+        self._frame_start = time.perf_counter()
+
+    def dropped(self):
+        """播放落后、丢弃了一帧：按耗时为帧预算的两倍计"""
+        self._observe(2.0)
+
+    def end(self, fps, waited, next_trigger=None):
+        """显示了一帧：waited 为音画同步等待的秒数（不计入耗时），next_trigger 为下一个触发点（跳帧不越过它）。
+        内部分辨率变化时返回 True，调用方应按新的屏幕尺寸重新布局"""
+        cost = time.perf_counter() - self._frame_start - waited
+        self._observe(cost * fps / self.frame_step)
+        if self._decoder is not None:
+            if self.frame_step > 1:
+                self._decoder.fast_forward(self.frame_step, next_trigger)
+            elif self._decoder.step != 1:
+                self._decoder.fast_forward(1)
+        resized, self._resized = self._resized, False
+        return resized
+
+    def _observe(self, ratio):
+        """记录一帧的耗时比例（耗时 / 帧预算），需要时调整等级"""
+        self._frames += 1
+        self.average = min(self.average * 0.9 + ratio * 0.1, 10.0)  # 等待玩家操作等异常长的帧不会让平均值过大
+        if self.average > self.high:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.down_frames:
+                self._step(1)
+        elif self.average < self.low:
+            self._under += 1
+            self._over = 0
+            if self._under >= self._up_wait:
+                self._step(-1)
+        else:
+            self._over = self._under = 0
+
+    def _scaled(self, level):
+        return level >= HALF_RES and HALF_RES not in self.unavailable
+
+    def _step(self, direction):
+        """降级（direction 为 1）或升级（-1），跳过无法切换的等级"""
+        self._over = self._under = 0
+        level = self.level + direction
+        while 0 < level <= self.max_level and level in self.unavailable:
+            level += direction
+        if not 0 <= level <= self.max_level:
+            return
+        if self._scaled(level) != self._scaled(self.level):
+            # 切换失败时显示 Surface 也已重新创建，同样需要重绘
+            self._resized = True
+            if not self.runtime.set_render_scale(self.render_scale if self._scaled(level) else 1.0):
+                if direction > 0:
+                    self.unavailable.add(HALF_RES)
+                    self._step(direction)
+                return
+        if direction > 0 and self._last_up is not None and self._frames - self._last_up < self._up_wait:
+            # 升级后很快又不够用：下次升级前等待更久
+            self._up_wait = min(self._up_wait * 2, self.up_frames * 16)
+        if direction < 0:
+            self._last_up = self._frames
+        previous, self.level = self.level, level
+        if self._decoder is not None:
+            self._decoder.set_interpolation(self.interpolation)
+        self.changes.append((time.perf_counter(), level, self.average))
+        if self.profiler is not None:
+            self.profiler.record_quality(level)
+        print(f"画质调整: {LEVEL_NAMES[previous]} -> {LEVEL_NAMES[level]}（平均每帧耗时为预算的 "
+              f"{self.average * 100:.0f}%）")
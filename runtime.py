@@ -0,0 +1,319 @@
+import importlib
+import os
+import sys
+import threading
+
+import pygame
+
+import asset_pack
+from av_sync import FastForward
+from text_cache import text_cache
+
+
+def resource_path(relative_path):
+    """获取资源文件的绝对路径"""
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+def queue_size_from_env(default=8):
+    """后台解码队列深度：环境变量 FRAME_QUEUE_SIZE（默认 8），内存紧张时可调小，解码耗时波动大时可调大"""
+    try:
+        size = int(os.environ.get("FRAME_QUEUE_SIZE", str(default)))
+    except ValueError:
+        print(f"FRAME_QUEUE_SIZE 不是有效的整数，使用默认值 {default}")
+        return default
+    return max(1, size)
+
+
+class Runtime:
+    """所有章节共用的运行环境：窗口、音频、时钟、字体和各类缓存只初始化一次，章节切换时直接复用。
+    依赖 OpenCV 的部分（帧缓存、预取器）在第一次使用时才创建，标题画面不必等待 cv2 加载"""
+
+    def __init__(self, screen_width=None, screen_height=None, frame_queue_size=None):
+        pygame.init()
+        pygame.mixer.init()
+
+        if screen_width is None or screen_height is None:
+            infoObject = pygame.display.Info()
+            screen_width, screen_height = infoObject.current_w, infoObject.current_h
+        self.screen_width = int(screen_width)
+        self.screen_height = int(screen_height)
+        self.window_size = (self.screen_width, self.screen_height)  # 窗口尺寸（内部渲染分辨率降低时不变）
+        self.render_scale = 1.0
+        self.screen = pygame.display.set_mode(self.window_size)
+        pygame.display.set_caption("秒速五厘米")
+        # 先显示背景色，字体加载期间窗口不会停留在未绘制的状态
+        self.screen.fill((0, 0, 0))
+        pygame.display.flip()
+
+        # 加载字体（字体文件只解析一次）
+        font_path = resource_path("res/simhei.ttf")
+        if not asset_pack.exists(font_path):
+            if os.environ.get("STARTUP_PROBE"):
+                # 启动耗时检查不依赖专有的字体文件：报告缺失后改用 pygame 自带的字体继续
+                print(f"asset_missing {font_path}", flush=True)
+                font_path = None
+            else:
+                print(f"字体文件 {font_path} 不存在，请确保字体文件在项目目录中。")
+                pygame.quit()
+                sys.exit()
+        self.font_large = text_cache.load_font(font_path, 48)
+        self.font_small = text_cache.load_font(font_path, 24)
+
+        self.clock = pygame.time.Clock()
+        # 后台解码队列深度（预先解码的帧数），未指定时由环境变量 FRAME_QUEUE_SIZE 设置
+        self._frame_queue_size = frame_queue_size or queue_size_from_env()
+        self._frame_cache = None
+        self._frame_cache_loaded = False
+        self._parallel_decode = None
+        self._parallel_decode_loaded = False
+        self._parallel_decode_lock = threading.Lock()
+        self._prefetcher = None
+        self._gestures = None
+        self._keyframes = None
+        self._checkpoints = None
+        self._audio_cache = None
+        self._audio_cache_lock = threading.Lock()
+        self._manifest = None
+        self._manifest_lock = threading.Lock()
+        self._governor = None
+        self._governor_loaded = False
+        self.fast_forward = FastForward()  # 播放时按 Tab 快进，跨章节保持
+        self.skip_seen = False  # 已看过的片段直接跳到下一个交互（main.py --skip-seen）
+        # 可选的分阶段帧计时（设置环境变量 FRAME_PROFILE 启用，播放时按 F3 显示 HUD）
+        self.profiler = None
+        if os.environ.get("FRAME_PROFILE"):
+            from frame_profiler import FrameProfiler
+            self.profiler = FrameProfiler.from_env()
+
+    @property
+    def frame_queue_size(self):
+        return self._frame_queue_size
+
+    @frame_queue_size.setter
+    def frame_queue_size(self, size):
+        """修改后台解码队列深度，之后打开和预取的片段按新深度解码（已在解码的片段不变）"""
+        self._frame_queue_size = max(1, int(size))
+        if self._prefetcher is not None:
+            self._prefetcher.queue_size = self._frame_queue_size
+
+    @property
+    def frame_cache(self):
+        """可选的磁盘帧缓存（设置环境变量 FRAME_CACHE_MAX_GB 启用）"""
+        if not self._frame_cache_loaded:
+            from frame_cache import FrameCache
+            self._frame_cache = FrameCache.from_env()
+            self._frame_cache_loaded = True
+        return self._frame_cache
+
+    @property
+    def parallel_decode(self):
+        """可选的多进程分段解码（设置环境变量 PARALLEL_DECODE 启用，用于高分辨率视频）"""
+        with self._parallel_decode_lock:
+            if not self._parallel_decode_loaded:
+                if os.environ.get("PARALLEL_DECODE"):
+                    from parallel_decoder import ParallelDecodePool
+                    self._parallel_decode = ParallelDecodePool.from_env()
+                self._parallel_decode_loaded = True
+        return self._parallel_decode
+
+    @property
+    def prefetcher(self):
+        if self._prefetcher is None:
+            from clip_prefetch import ClipPrefetcher
+            self._prefetcher = ClipPrefetcher(self.screen_width, self.screen_height, self.frame_queue_size,
+                                              frame_cache=self.frame_cache, profiler=self.profiler,
+                                              keyframes=self.keyframes, parallel=self.parallel_decode,
+                                              audio_cache=self.audio_cache, manifest=self.manifest)
+        return self._prefetcher
+
+    @property
+    def keyframes(self):
+        """关键帧索引（保存在缓存目录，每个视频只扫描一次），用于从视频中间开始播放"""
+        if self._keyframes is None:
+            from keyframe_index import KeyframeStore
+            self._keyframes = KeyframeStore()
+        return self._keyframes
+
+    @property
+    def manifest(self):
+        """资源清单（res/manifest.json），第一次使用时按文件大小和修改时间校验剧情用到的所有资源并输出缺失的文件"""
+        with self._manifest_lock:
+            if self._manifest is None:
+                from asset_manifest import preflight
+                self._manifest = preflight(resource_path(""))
+        return self._manifest
+
+    @property
+    def audio_cache(self):
+        """音频解码缓存（内存上限由环境变量 AUDIO_CACHE_MB 设置），预取片段和标题画面时在后台线程中使用"""
+        with self._audio_cache_lock:
+            if self._audio_cache is None:
+                from audio_cache import AudioCache
+                self._audio_cache = AudioCache.from_env()
+        return self._audio_cache
+
+    @property
+    def governor(self):
+        """自适应画质（默认启用且只调整缩放插值，环境变量 QUALITY_GOVERNOR 设置最多降到的等级，为 0 时关闭），第一次播放视频时创建"""
+        if not self._governor_loaded:
+            from quality_governor import QualityGovernor
+            self._governor = QualityGovernor.from_env(self)
+            if self._governor is not None:
+                self._governor.profiler = self.profiler
+            self._governor_loaded = True
+        return self._governor
+
+    def set_render_scale(self, scale):
+        """以窗口尺寸的 scale 倍作为内部渲染分辨率，由 SDL 硬件缩放到窗口（pygame.SCALED），scale 为 1 时恢复。
+        当前环境无法切换时恢复原来的显示模式并返回 False"""
+        width, height = self.window_size
+        previous = self.screen.get_size(), pygame.SCALED if self.render_scale < 1 else 0
+        try:
+            if scale < 1:
+                pygame.display.set_mode((max(1, int(width * scale)), max(1, int(height * scale))), pygame.SCALED)
+            else:
+                pygame.display.set_mode(self.window_size)
+        except pygame.error as e:
+            print(f"无法切换内部渲染分辨率: {e}")
+            # 切换失败时原来的显示 Surface 已失效，需要重新创建
+            pygame.display.set_mode(*previous)
+            self.resize_screen()
+            return False
+        self.render_scale = scale
+        if self._gestures is not None:
+            self._gestures.scale = scale
+        self.resize_screen()
+        return True
+
+    @property
+    def checkpoints(self):
+        """剧情进度存档（启动时读取已有存档，保留已看过的片段）"""
+        if self._checkpoints is None:
+            from checkpoint import CheckpointStore
+            self._checkpoints = CheckpointStore()
+            self._checkpoints.load()
+        return self._checkpoints
+
+    @property
+    def gestures(self):
+        """滑动识别（采样点和轨迹都保存在其中）"""
+        if self._gestures is None:
+            from gestures import GestureTracker
+            self._gestures = GestureTracker()
+            self._gestures.scale = self.render_scale
+        return self._gestures
+
+    def toggle_hud(self):
+        """切换帧计时 HUD；未启用计时时从现在开始计时（之后打开的视频才有解码线程的数据）"""
+        if self.profiler is None:
+            from frame_profiler import FrameProfiler
+            self.profiler = FrameProfiler()
+            if self._prefetcher is not None:
+                self._prefetcher.profiler = self.profiler
+            if self._governor is not None:
+                self._governor.profiler = self.profiler
+        self.profiler.toggle_hud()
+        return self.profiler
+
+    def preload(self, *module_names, audio_paths=(), tasks=()):
+        """在后台线程中提前导入之后才用到的模块（OpenCV、后续章节），并把 audio_paths 解码为 PCM，首次使用时不再等待。
+        tasks 为之后在同一线程中依次调用的函数（例如预先渲染后续章节的文字）"""
+        def load():
+            # 先校验资源清单，缺失的资源在标题画面时就能发现
+            self.manifest
+            for name in module_names:
+                try:
+                    importlib.import_module(name)
+                except ImportError as e:
+                    print(f"预加载模块 {name} 失败: {e}")
+            # 并行解码的工作进程启动较慢，也提前在后台启动
+            self.parallel_decode
+            for path in audio_paths:
+                self.audio_cache.get(path)
+            for task in tasks:
+                try:
+                    task()
+                except Exception as e:
+                    print(f"后台预加载任务失败: {e}")
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def resize_screen(self):
+        """窗口尺寸变化后更新屏幕和预取器的尺寸"""
+        self.screen = pygame.display.get_surface()
+        self.screen_width, self.screen_height = self.screen.get_size()
+        if self._prefetcher is not None:
+            self._prefetcher.resize_screen(self.screen_width, self.screen_height)
+
+
+_runtime = None
+
+
+def get_runtime(screen_width=None, screen_height=None, frame_queue_size=None):
+    """返回共用的运行环境，第一次调用时创建"""
+    global _runtime
+    if _runtime is None:
+        _runtime = Runtime(screen_width, screen_height, frame_queue_size)
+    return _runtime
+
+
+class ChapterView:
+    """章节界面的基类：屏幕、字体、时钟和缓存都取自共用的运行环境，创建章节不再重复初始化"""
+
+    def __init__(self, runtime=None):
+        self.runtime = runtime or get_runtime()
+
+    @property
+    def screen(self):
+        return self.runtime.screen
+
+    @property
+    def screen_width(self):
+        return self.runtime.screen_width
+
+    @property
+    def screen_height(self):
+        return self.runtime.screen_height
+
+    @property
+    def font_large(self):
+        return self.runtime.font_large
+
+    @property
+    def font_small(self):
+        return self.runtime.font_small
+
+    @property
+    def clock(self):
+        return self.runtime.clock
+
+    @property
+    def frame_queue_size(self):
+        return self.runtime.frame_queue_size
+
+    @frame_queue_size.setter
+    def frame_queue_size(self, size):
+        self.runtime.frame_queue_size = size
+
+    @property
+    def frame_cache(self):
+        return self.runtime.frame_cache
+
+    @property
+    def prefetcher(self):
+        return self.runtime.prefetcher
+
+    @property
+    def gestures(self):
+        return self.runtime.gestures
+
+    @property
+    def fast_forward(self):
+        return self.runtime.fast_forward
@@ -0,0 +1,59 @@
+SWIPE = "swipe"
+PAUSE = "pause"
+
+DEFAULT_SWIPE_MESSAGE = "请滑动"
+
+
+class Trigger:
+    """一个已编译的场景触发点：帧号、类型以及预先确定的提示文字"""
+
+    def __init__(self, frame, kind, message, direction=None):
+        self.frame = frame
+        self.kind = kind
+        self.message = message
+        self.direction = direction
+
+
+class TriggerTable:
+    """按帧号排序的触发表，每个视频打开时编译一次。
+    播放时用游标顺序推进，每帧只需一次比较；跳过或丢弃的帧上的触发点在之后第一帧触发，不会漏掉"""
+
+    def __init__(self, fps, swipe_scenes=None, pause_scenes=None, swipe_messages=None):
+        swipe_messages = swipe_messages or {}
+        triggers = []
+        for scene in swipe_scenes or []:
+            direction = scene['direction']
+            message = scene.get('message') or swipe_messages.get(direction, DEFAULT_SWIPE_MESSAGE)
+            triggers.append(Trigger(int(scene['time'] * fps), SWIPE, message, direction))
+        for scene in pause_scenes or []:
+            triggers.append(Trigger(int(scene['time'] * fps), PAUSE, scene['message']))
+        # 同一帧上先滑动后暂停（与原先的检查顺序一致）
+        triggers.sort(key=lambda trigger: (trigger.frame, trigger.kind != SWIPE))
+        self.triggers = triggers
+        self.cursor = 0
+        self.next_frame = triggers[0].frame if triggers else None
+
+    def reset(self, frame_index):
+        """从 frame_index 开始播放（跳转或继续游戏）：之前的触发点视为已完成，该帧及之后的重新等待触发"""
+        self.cursor = 0
+        while self.cursor < len(self.triggers) and self.triggers[self.cursor].frame < frame_index:
+            self.cursor += 1
+        self.next_frame = self.triggers[self.cursor].frame if self.cursor < len(self.triggers) else None
+
+    def resume_after(self, frame_index):
+        """按已显示的帧数调用 due 的播放（第一章：显示第 i 帧后调用 due(i + 1)）从第 frame_index 帧开始：
+        继续游戏时 due(frame_index) 已在上次播放中处理过，帧号不大于 frame_index 的触发点视为已完成"""
+        self.reset(frame_index + 1 if frame_index > 0 else 0)
+
+    def due(self, frame_index):
+        """返回帧号不大于 frame_index 且尚未触发的触发点"""
+        if self.next_frame is None or frame_index < self.next_frame:
+            return ()
+        start = self.cursor
+        end = start
+        while end < len(self.triggers) and self.triggers[end].frame <= frame_index:
+            end += 1
+        self.cursor = end
+        self.next_frame = self.triggers[end].frame if end < len(self.triggers) else None
+        return self.triggers[start:end]
+
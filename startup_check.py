@@ -0,0 +1,65 @@
+"""启动耗时检查：启动 main.py 直到标题画面显示，检查耗时是否在预算内、OpenCV 等重模块是否被推迟加载。
+
+用法：python startup_check.py [--budget-ms 800] [--runs 3]
+超出预算或标题显示前已加载推迟模块时返回非零退出码，可在打包前或持续集成中运行。
+缺少专有资源（如 res/simhei.ttf）时 main.py 改用替代资源继续测量；因缺少资源而无法显示标题时跳过检查，不视为超出预算。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class AssetMissing(Exception):
+    """main.py 因缺少资源而没有显示标题画面"""
+
+
+def measure_once(main_script):
+    """启动一次 main.py，返回 (标题显示耗时毫秒, 标题显示前已加载的推迟模块列表, 缺失的资源列表)"""
+    env = dict(os.environ, STARTUP_PROBE="1", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    start = time.time()
+    result = subprocess.run([sys.executable, main_script], cwd=HERE, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=60)
+    missing = []
+    for line in result.stdout.splitlines():
+        if line.startswith("asset_missing "):
+            missing.append(line.split(" ", 1)[1])
+        elif line.startswith("title_shown "):
+            _, shown_at, loaded = line.split()
+            return (float(shown_at) - start) * 1000, [] if loaded == "-" else loaded.split(","), missing
+    if missing:
+        raise AssetMissing(", ".join(missing))
+    raise RuntimeError(f"main.py 未显示标题画面（退出码 {result.returncode}）:\n{result.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查冷启动到标题画面的耗时")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("STARTUP_BUDGET_MS", 800)),
+                        help="启动耗时预算（毫秒），取多次运行的中位数比较")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--main", default=os.path.join(HERE, "main.py"))
+    args = parser.parse_args()
+
+    times = []
+    for _ in range(args.runs):
+        try:
+            elapsed, loaded, missing = measure_once(args.main)
+        except AssetMissing as e:
+            print(f"跳过启动耗时检查：缺少资源 {e}")
+            return 0
+        times.append(elapsed)
+        print(f"标题画面显示耗时: {elapsed:.0f} ms" + (f"（缺少 {', '.join(missing)}，使用替代资源）" if missing else ""))
+        if loaded:
+            print(f"标题显示前已加载推迟的模块: {', '.join(loaded)}")
+            return 1
+    times.sort()
+    median = times[len(times) // 2]
+    print(f"中位数 {median:.0f} ms，预算 {args.budget_ms:.0f} ms")
+    return 0 if median <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import json
+
+# 节点类型
+CLIP = "clip"  # 播放视频片段
+TEXT = "text"  # 黑屏文本，点击继续
+CHOICE = "choice"  # 选择界面，每个选项一条边
+CHAPTER = "chapter"  # 进入另一章节（由对应章节的 Game 接管）
+
+NODE_TYPES = (CLIP, TEXT, CHOICE, CHAPTER)
+
+
+class StoryGraph:
+    """剧情图：从声明式的剧情文件加载，并在加载时预编译为按整数索引的形式，
+    供运行、预取和校验直接查表使用"""
+
+    def __init__(self, data):
+        nodes = data["nodes"]
+        self.names = list(nodes)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.nodes = [nodes[name] for name in self.names]
+        self.kinds = [node.get("type") for node in self.nodes]
+
+        self.validate(data)
+
+        # 每个节点的后继节点索引（选择节点按选项顺序排列）
+        self.successors = []
+        self.option_texts = []
+        for node, kind in zip(self.nodes, self.kinds):
+            if kind == CHOICE:
+                self.option_texts.append([option["text"] for option in node["options"]])
+                self.successors.append([self.index[option["next"]] for option in node["options"]])
+            else:
+                self.option_texts.append(None)
+                next_name = node.get("next")
+                self.successors.append([self.index[next_name]] if next_name else [])
+
+        self.starts = {chapter: self.index[name] for chapter, name in data["starts"].items()}
+
+        # 剧情中出现的文字，供启动时预先渲染
+        self.choice_texts = sorted({text for texts in self.option_texts if texts for text in texts})
+        self.title_texts = sorted({node["title"] for node, kind in zip(self.nodes, self.kinds) if kind == TEXT})
+        self.subtitle_texts = sorted({node["subtitle"] for node, kind in zip(self.nodes, self.kinds) if kind == TEXT})
+        self.prompt_texts = sorted({scene["message"] for node in self.nodes
+                                    for scene in node.get("pause_scenes", []) + node.get("swipe_scenes", [])
+                                    if scene.get("message")})
+
+        # 每个节点之后可能播放的视频片段（穿过文本和选择节点，在章节边界停止），用于预取
+        self.next_clips = [self._reachable_clips(i) for i in range(len(self.nodes))]
+
+    def validate(self, data):
+        """校验节点类型、必填字段以及所有边都指向存在的节点"""
+        errors = []
+        for name, node, kind in zip(self.names, self.nodes, self.kinds):
+            if kind not in NODE_TYPES:
+                errors.append(f"{name}: 未知节点类型 {kind}")
+                continue
+            if kind == CLIP and not node.get("video"):
+                errors.append(f"{name}: 缺少 video")
+            if kind == CHAPTER and not node.get("chapter"):
+                errors.append(f"{name}: 缺少 chapter")
+            if kind == CHOICE:
+                if not node.get("options"):
+                    errors.append(f"{name}: 缺少 options")
+                targets = [option.get("next") for option in node.get("options", [])]
+            else:
+                targets = [node["next"]] if node.get("next") else []
+            for target in targets:
+                if target not in self.index:
+                    errors.append(f"{name}: 指向不存在的节点 {target}")
+        for chapter, name in data.get("starts", {}).items():
+            if name not in self.index:
+                errors.append(f"章节 {chapter} 的起点 {name} 不存在")
+        if errors:
+            raise ValueError("剧情文件有误:\n" + "\n".join(errors))
+
+    def _reachable_clips(self, node):
+        """从 node 出发、不经过其他视频片段即可到达的视频片段列表 [(video, audio), ...]"""
+        clips = []
+        seen = set()
+        pending = list(self.successors[node])
+        while pending:
+            i = pending.pop(0)
+            if i in seen:
+                continue
+            seen.add(i)
+            if self.kinds[i] == CLIP:
+                clips.append((self.nodes[i]["video"], self.nodes[i].get("audio")))
+            elif self.kinds[i] != CHAPTER:
+                pending.extend(self.successors[i])
+        return clips
+
+
+_loaded = {}
+
+
+def load_story(path):
+    """加载并预编译剧情文件，同一文件只加载一次"""
+    graph = _loaded.get(path)
+    if graph is None:
+        with open(path, encoding="utf-8") as f:
+            graph = StoryGraph(json.load(f))
+        _loaded[path] = graph
+    return graph
+
+
+def run_story(game, graph, chapter, start_node=None, start_frame=0, checkpoints=None, skip_seen=False):
+    """从章节起点（或继续游戏时的 start_node 及其视频的第 start_frame 帧）开始运行剧情，
+    依次调用 game 的播放、选择和文本界面；每个片段、选择和触发点之后把进度写入 checkpoints。
+    skip_seen 为 True 时存档中记录为已看过的片段直接跳到下一个交互"""
+    node = graph.index[start_node] if start_node else graph.starts[chapter]
+
+    def save(node, frame=0, **kwargs):
+        if checkpoints is not None:
+            checkpoints.save(chapter, graph.names[node] if node is not None else None, frame, **kwargs)
+
+    save(node, start_frame)
+    while node is not None:
+        spec = graph.nodes[node]
+        kind = graph.kinds[node]
+        successors = graph.successors[node]
+        if kind == CLIP:
+            current = node
+            game.play_video_and_audio(spec["video"], spec.get("audio"),
+                                      swipe_scenes=spec.get("swipe_scenes"),
+                                      pause_scenes=spec.get("pause_scenes"),
+                                      next_clips=graph.next_clips[node],
+                                      start_frame=start_frame,
+                                      on_trigger=lambda frame: save(current, frame),
+                                      skip=skip_seen and checkpoints is not None
+                                      and spec["video"] in checkpoints.state["seen"],
+                                      stop_audio=not (successors and graph.kinds[successors[0]] == CLIP))
+            start_frame = 0
+            node = successors[0] if successors else None
+            save(node, seen=spec["video"])
+            continue
+        elif kind == TEXT:
+            game.show_text_screen(spec["title"], spec["subtitle"])
+        elif kind == CHOICE:
+            options = graph.option_texts[node]
+            choice = game.display_choices(options)
+            node = successors[options.index(choice)]
+            save(node, choice=choice)
+            continue
+        elif kind == CHAPTER:
+            game.enter_chapter(spec["chapter"])
+            return
+        node = successors[0] if successors else None
+        save(node)
+    # 故事结束，下次从头开始
+    if checkpoints is not None:
+        checkpoints.clear()
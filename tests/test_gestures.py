@@ -0,0 +1,68 @@
+"""滑动判定的边界情况：与拆分前各章节 detect_swipe 的条件一致"""
+import pygame
+import pytest
+
+import gestures
+from gestures import CHAPTER_ONE_GESTURES, GestureTracker
+
+
+def swipe(tracker, monkeypatch, end, direction, table=None, duration=200, via=()):
+    """从 (500, 500) 按下，经过 via 中的各点，duration 毫秒后在 end 处（相对按下位置的位移）松开"""
+    ticks = [0]
+    monkeypatch.setattr(gestures.pygame.time, "get_ticks", lambda: ticks[0])
+    start = (500, 500)
+    tracker.feed(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=start), direction, table)
+    for at, (dx, dy) in via:
+        ticks[0] = at
+        tracker.feed(pygame.event.Event(pygame.MOUSEMOTION, pos=(start[0] + dx, start[1] + dy)), direction, table)
+    ticks[0] = duration
+    up = pygame.event.Event(pygame.MOUSEBUTTONUP, pos=(start[0] + end[0], start[1] + end[1]))
+    return tracker.feed(up, direction, table)
+
+
+@pytest.mark.parametrize("end, direction, expected", [
+    ((150, 90), "right", True),  # 第一章向右允许 100 像素以内的垂直偏移
+    ((150, 100), "right", False),
+    ((100, 0), "right", False),  # 距离需超过 100
+    ((200, -10), "right_up", False),  # 向右上需两个方向都超过 100
+    ((150, -150), "right_up", True),
+    ((-150, 0), "left", False),  # 第一章没有向左滑动
+])
+def test_chapter_one(monkeypatch, end, direction, expected):
+    assert swipe(GestureTracker(), monkeypatch, end, direction, CHAPTER_ONE_GESTURES) is expected
+
+
+@pytest.mark.parametrize("end, direction, expected", [
+    ((150, 40), "right", True),
+    ((150, 60), "right", False),  # 第二、三章只允许 50 像素以内的垂直偏移
+    ((-150, 0), "left_hug", True),
+    ((-30, -120), "up", True),
+    ((0, 120), "down", True),
+    ((60, 120), "down", False),
+    ((-150, 150), "left_down", True),
+    ((-150, 90), "left_down", False),
+    ((150, 0), "right_finger", True),
+])
+def test_later_chapters(monkeypatch, end, direction, expected):
+    assert swipe(GestureTracker(), monkeypatch, end, direction) is expected
+
+
+def test_duration_is_press_to_release(monkeypatch):
+    tracker = GestureTracker()
+    assert swipe(tracker, monkeypatch, (150, 0), "right", duration=999)
+    assert not swipe(tracker, monkeypatch, (150, 0), "right", duration=1000)
+    # 按住不动很久之后再快速滑动，仍按按下到松开的时间计算
+    assert not swipe(tracker, monkeypatch, (150, 0), "right", duration=1500, via=[(1300, (10, 0))])
+
+
+def test_long_drag_keeps_press_position(monkeypatch):
+    tracker = GestureTracker(capacity=8)
+    via = [(i * 10, (i * 5, 0)) for i in range(1, 40)]
+    assert swipe(tracker, monkeypatch, (200, 0), "right", duration=500, via=via)
+
+
+def test_render_scale(monkeypatch):
+    tracker = GestureTracker()
+    tracker.scale = 0.5  # 半分辨率渲染时鼠标坐标减半，判定范围随之缩小
+    assert swipe(tracker, monkeypatch, (60, 20), "right")
+    assert not swipe(tracker, monkeypatch, (60, 30), "right")
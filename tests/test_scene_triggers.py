@@ -0,0 +1,30 @@
+"""继续游戏的位置：完成触发点后保存的帧号，重新打开后该触发点不会再次触发"""
+from scene_triggers import TriggerTable
+
+SCENES = [{"time": 24, "direction": "right"}]
+
+
+def test_resume_later_chapters():
+    # 第二、三章：显示第 i 帧后调用 due(i)，完成后保存 i + 1，继续时 reset
+    table = TriggerTable(30, swipe_scenes=SCENES)
+    fired = [i for i in range(800) if table.due(i)]
+    assert fired == [720]
+    table.reset(fired[0] + 1)
+    assert not any(table.due(i) for i in range(fired[0] + 1, 800))
+
+
+def test_resume_chapter_one():
+    # 第一章：显示第 i 帧后调用 due(i + 1)，完成后保存 i + 1（current_frame），继续时 resume_after
+    table = TriggerTable(30, swipe_scenes=SCENES)
+    fired = [i for i in range(800) if table.due(i + 1)]
+    assert fired == [719]
+    table.resume_after(fired[0] + 1)
+    assert not any(table.due(i + 1) for i in range(fired[0] + 1, 800))
+
+
+def test_resume_from_start():
+    # 从头播放时第一个触发点仍然有效
+    table = TriggerTable(30, swipe_scenes=SCENES)
+    table.due(800)
+    table.resume_after(0)
+    assert table.next_frame == 720
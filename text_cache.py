@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+
+import pygame
+
+import asset_pack
+
+
+class TextCache:
+    """渲染文字的 Surface 缓存：按 (字体文件, 字号, 文字, 颜色) 缓存，超过内存上限时淘汰最久未使用的条目。
+    字体也在这里按 (字体文件, 字号) 只加载一次。标题画面的后台加载线程也会写入缓存，读写都在锁内进行"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.fonts = {}  # (字体文件, 字号) -> Font
+        self.font_keys = {}  # id(Font) -> (字体文件, 字号)
+        self.surfaces = OrderedDict()  # (字体文件, 字号, 文字, 颜色) -> Surface
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def load_font(self, font_path, size):
+        """加载字体，同一字体文件和字号只解析一次；font_path 为 None 时使用 pygame 自带的字体"""
+        key = (font_path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(asset_pack.source(font_path) if font_path else None, size)  # 资源包中的字体直接从内存读取
+            self.fonts[key] = font
+            self.font_keys[id(font)] = key
+        return font
+
+    def _font_key(self, font):
+        key = self.font_keys.get(id(font))
+        if key is None:
+            # 未经 load_font 加载的字体：保留引用，保证 id 不会被复用
+            key = (id(font), None)
+            self.fonts[key] = font
+            self.font_keys[id(font)] = key
+        return key
+
+    def render(self, font, text, color):
+        """返回渲染好的文字（抗锯齿），相同参数直接复用"""
+        with self._lock:
+            return self._render(self._font_key(font), font, text, color)
+
+    def _render(self, font_key, font, text, color):
+        key = font_key + (text, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        self.used_bytes += self._size(surface)
+        while self.used_bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, evicted = self.surfaces.popitem(last=False)
+            self.used_bytes -= self._size(evicted)
+        return surface
+
+    def warm(self, font, texts, color):
+        """预先渲染已知文字（同时让字体缓存其中的中日文字形），避免首次显示时卡顿"""
+        for text in texts:
+            if text:
+                self.render(font, text, color)
+
+    def warm_in_background(self, font, texts, color):
+        """在后台线程中预先渲染已知文字：Font 对象不能与主线程同时使用，因此用同一字体文件另行加载一份来渲染，
+        结果按相同的键存入缓存，主线程显示时直接命中"""
+        with self._lock:
+            font_key = self._font_key(font)
+        font_path, size = font_key
+        if size is None:
+            return  # 不是经 load_font 加载的字体，无法另行加载
+        private_font = pygame.font.Font(asset_pack.source(font_path) if font_path else None, size)
+        for text in texts:
+            if text:
+                with self._lock:
+                    self._render(font_key, private_font, text, color)
+
+    @staticmethod
+    def _size(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+# 所有章节共用的缓存
+text_cache = TextCache()
@@ -0,0 +1,189 @@
+"""分辨率阶梯：离线把资源清单中的每个视频转码为若干较低分辨率的版本（默认 720p/1080p/1440p/2160p，只生成低于原视频的），
+保存在 res/ladder/<高度>p/ 下并记录到清单条目的 variants 中。播放时按视频在屏幕上的显示尺寸选用不小于它的最小版本
+（见 AssetManifest.variant），解码和缩放的像素都更少。音频仍从原视频或音频文件读取，版本中不含音轨。
+
+用法：
+    python transcode_ladder.py [--heights 720 1080 1440 2160] [--workers N] [--crf 18]
+    python transcode_ladder.py --report-only   # 只测量已有版本节省的解码耗时
+需要先生成资源清单（python asset_manifest.py）和本地的 ffmpeg（见 audio_cache.ffmpeg_path）。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import asset_pack
+from asset_manifest import MANIFEST_PATH, AssetManifest, stamp
+from audio_cache import ffmpeg_path
+
+LADDER_DIR = os.path.join("res", "ladder")
+HEIGHTS = (720, 1080, 1440, 2160)
+
+
+def variant_path(video_path, height):
+    """video_path 的 height 版本的路径（res/ladder/<高度>p/ 下保持 res/ 中的相对路径）"""
+    relative = os.path.relpath(video_path, "res")
+    return os.path.join(LADDER_DIR, f"{height}p", relative).replace("\\", "/")
+
+
+def transcode(job):
+    """转码一个版本（在工作进程中运行），返回 (视频路径, 高度, 版本条目或错误信息)"""
+    import cv2
+    from keyframe_index import KeyframeStore
+
+    video_path, height, fps, frame_count, crf, preset, threads = job
+    output = variant_path(video_path, height)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    root, ext = os.path.splitext(output)
+    tmp_path = root + ".transcoding" + ext
+    # 关键帧间隔 1 秒，从中间开始播放和并行分段解码时定位更快；逐帧直通，帧序号与原视频一致（触发点按帧计算）
+    command = [ffmpeg_path(), "-v", "error", "-nostdin", "-y", "-i", asset_pack.ffmpeg_input(video_path),
+               "-map", "0:v:0", "-an", "-vf", f"scale=-2:{height}:flags=lanczos", "-fps_mode", "passthrough",
+               "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p",
+               "-g", str(max(1, round(fps))), "-threads", str(threads), "-movflags", "+faststart", tmp_path]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return video_path, height, f"转码失败: {message[-1] if message else result.returncode}"
+    os.replace(tmp_path, output)
+
+    cap = cv2.VideoCapture(output)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    # 顺便建立关键帧索引，同时核对帧数
+    index = KeyframeStore().get(output)
+    if index is None or index.frame_count != frame_count:
+        os.remove(output)
+        return video_path, height, f"帧数与原视频不一致（{index.frame_count if index else 0} / {frame_count}）"
+    return video_path, height, {"path": output, "width": width, "height": actual_height, "stamp": stamp(output)}
+
+
+def decode_ms(path, frames, sizes=()):
+    """解码 path 的前 frames 帧，返回 (每帧解码毫秒, {尺寸: 每帧缩放到该尺寸的毫秒})，无法读取时返回 None"""
+    import cv2
+
+    cap = asset_pack.open_video(path)
+    decode_time = 0.0
+    resize_time = dict.fromkeys(sizes, 0.0)
+    count = 0
+    while count < frames:
+        start = time.perf_counter()
+        ok, frame = cap.read()
+        decode_time += time.perf_counter() - start
+        if not ok:
+            break
+        for size in sizes:
+            start = time.perf_counter()
+            cv2.resize(frame, size)
+            resize_time[size] += time.perf_counter() - start
+        count += 1
+    cap.release()
+    if count == 0:
+        return None
+    return decode_time * 1000 / count, {size: total * 1000 / count for size, total in resize_time.items()}
+
+
+def report(manifest, frames):
+    """逐个视频测量（在本进程中依次进行，避免并行转码干扰计时）：原视频解码并缩放到版本尺寸的耗时与直接解码该版本的耗时，
+    按版本高度汇总输出节省的比例"""
+    totals = {}  # 高度 -> [原视频毫秒合计, 版本毫秒合计, 视频数]
+    for key, entry in manifest.clips.items():
+        variants = entry.get("variants", [])
+        if not variants:
+            continue
+        sizes = [(variant["width"], variant["height"]) for variant in variants]
+        source = decode_ms(key, frames, sizes)
+        if source is None:
+            print(f"无法读取视频: {key}")
+            continue
+        source_decode, source_resize = source
+        for variant, size in zip(variants, sizes):
+            measured = decode_ms(variant["path"], frames)
+            if measured is None:
+                print(f"无法读取分辨率版本: {variant['path']}")
+                continue
+            total = totals.setdefault(variant["height"], [0.0, 0.0, 0])
+            total[0] += source_decode + source_resize[size]
+            total[1] += measured[0]
+            total[2] += 1
+    if not totals:
+        print("没有可测量的分辨率版本")
+    for height, (source_ms, variant_ms, count) in sorted(totals.items()):
+        saving = (1 - variant_ms / source_ms) * 100 if source_ms else 0
+        print(f"{height}p: 原视频解码并缩放 {source_ms / count:.2f} ms/帧，该版本解码 {variant_ms / count:.2f} ms/帧，"
+              f"节省 {saving:.0f}%（{count} 个视频，每个测量前 {frames} 帧）")
+
+
+def build(manifest, heights, workers=None, crf=18, preset="slow", force=False):
+    """并行转码清单中缺少或已过期的版本并写回清单的 variants，返回出错的版本数"""
+    import multiprocessing
+
+    workers = workers or os.cpu_count()
+    threads = max(1, (os.cpu_count() or 1) // workers)  # 每个 ffmpeg 的编码线程数，避免进程数乘线程数远超 CPU 核数
+    jobs = []
+    for key, entry in manifest.clips.items():
+        if stamp(key) is None:
+            print(f"视频文件不存在: {key}")
+            continue
+        current = {variant["height"]: variant for variant in entry.get("variants", [])}
+        for height in heights:
+            if height >= entry["height"]:
+                continue
+            variant = current.get(height)
+            if not force and variant is not None and variant["stamp"] == stamp(variant["path"]):
+                continue
+            jobs.append((key, height, entry["fps"], entry["frames"], crf, preset, threads))
+    if not jobs:
+        print("所有分辨率版本都已是最新")
+        return 0
+
+    errors = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for video_path, height, result in pool.imap_unordered(transcode, jobs):
+            if isinstance(result, str):
+                print(f"{video_path} {height}p: {result}")
+                errors += 1
+                continue
+            entry = manifest.clips[video_path]
+            variants = [variant for variant in entry.get("variants", []) if variant["height"] != result["height"]]
+            entry["variants"] = sorted(variants + [result], key=lambda variant: variant["height"])
+            print(f"已生成: {result['path']}（{result['width']}x{result['height']}）")
+    manifest.save(MANIFEST_PATH)
+    print(f"已转码 {len(jobs) - errors} 个版本（{errors} 个出错），耗时 {time.perf_counter() - start:.1f} 秒，"
+          f"清单已保存到 {MANIFEST_PATH}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把资源清单中的视频转码为多个分辨率版本")
+    parser.add_argument("--heights", type=int, nargs="+", default=list(HEIGHTS), help="要生成的版本高度")
+    parser.add_argument("--workers", type=int, default=None, help="并行转码的进程数（默认为 CPU 核数）")
+    parser.add_argument("--crf", type=int, default=18, help="x264 的 CRF 质量参数")
+    parser.add_argument("--preset", default="slow", help="x264 的编码预设")
+    parser.add_argument("--force", action="store_true", help="重新生成已有的版本")
+    parser.add_argument("--frames", type=int, default=120, help="测量解码耗时时每个视频解码的帧数")
+    parser.add_argument("--report-only", action="store_true", help="只测量已有版本节省的解码耗时")
+    args = parser.parse_args()
+
+    manifest = AssetManifest.load(MANIFEST_PATH)
+    if not manifest.clips:
+        print(f"资源清单 {MANIFEST_PATH} 不存在或为空，请先运行 python asset_manifest.py")
+        return 1
+    errors = 0
+    if not args.report_only:
+        if ffmpeg_path() is None:
+            print("找不到 ffmpeg（可设置环境变量 FFMPEG_BINARY）")
+            return 1
+        errors = build(manifest, args.heights, args.workers, args.crf, args.preset, args.force)
+    report(manifest, args.frames)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
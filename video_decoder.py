@@ -0,0 +1,307 @@
+import threading
+import queue
+
+import pygame
+import cv2
+import numpy as np
+
+from frame_profiler import GRAB, READ, RESIZE, RECORD, QUEUE
+
+
+class VideoLayout:
+    """视频在屏幕上的布局：保持宽高比的目标尺寸、居中偏移和黑边区域。
+    每个视频打开时以及窗口尺寸变化时计算一次，而不是每帧重新计算"""
+
+    def __init__(self, frame_width, frame_height, screen_width, screen_height):
+        self.frame_size = (frame_width, frame_height)
+        self.screen_size = (screen_width, screen_height)
+
+        # 获取原始宽高比，保持视频比例
+        aspect_ratio = frame_width / frame_height
+        target_width = screen_width
+        target_height = int(screen_width / aspect_ratio)
+
+        if target_height > screen_height:
+            target_height = screen_height
+            target_width = int(screen_height * aspect_ratio)
+
+        self.target_size = (target_width, target_height)
+
+        # 居中视频
+        self.x_offset = (screen_width - target_width) // 2
+        self.y_offset = (screen_height - target_height) // 2
+        self.position = (self.x_offset, self.y_offset)
+        self.rect = pygame.Rect(self.position, self.target_size)
+
+        # 视频区域以外的黑边
+        bars = [
+            pygame.Rect(0, 0, screen_width, self.y_offset),
+            pygame.Rect(0, self.rect.bottom, screen_width, screen_height - self.rect.bottom),
+            pygame.Rect(0, self.y_offset, self.x_offset, target_height),
+            pygame.Rect(self.rect.right, self.y_offset, screen_width - self.rect.right, target_height),
+        ]
+        self.bar_rects = [bar for bar in bars if bar.width > 0 and bar.height > 0]
+
+    def matches(self, frame_width, frame_height, screen_width, screen_height):
+        return self.frame_size == (frame_width, frame_height) and self.screen_size == (screen_width, screen_height)
+
+    def paint_letterbox(self, surface, color):
+        """只绘制黑边区域，视频区域由每帧覆盖"""
+        for bar in self.bar_rects:
+            surface.fill(color, bar)
+
+
+class FrameUploader:
+    """零拷贝帧上传：解码后的 BGR 数据直接缩放进预分配缓冲区，缓冲区本身即 Surface 的像素，
+    无需 cvtColor、make_surface、旋转和翻转，稳定播放时每帧不产生新的内存分配"""
+
+    def __init__(self, screen_width, screen_height, slots, frame_size=None):
+        self.screen_size = (screen_width, screen_height)
+        self.slots = max(2, int(slots))
+        self.raw = None  # 原始解码帧缓冲区（需要缩放时使用）
+        self.buffers = []
+        self.surfaces = []
+        self.next_slot = 0
+        self.layout = None
+        self.last_buffer = None  # 最近一次上传的帧数据
+        self.interpolation = cv2.INTER_LINEAR  # 缩放插值方式（自适应画质降级时改为最近邻）
+        self._pending_screen_size = None
+        if frame_size and frame_size[0] > 0 and frame_size[1] > 0:
+            # 打开视频时即按容器中的尺寸分配，避免首帧再计算
+            self._allocate(*frame_size)
+
+    def resize_screen(self, screen_width, screen_height):
+        """窗口尺寸变化时调用，下一帧按新布局重新分配缓冲区"""
+        self._pending_screen_size = (screen_width, screen_height)
+
+    def _allocate(self, frame_width, frame_height):
+        """根据视频尺寸计算布局并分配环形缓冲区"""
+        self.layout = VideoLayout(frame_width, frame_height, *self.screen_size)
+        # 缓冲区在首次使用时才分配，预取时只占用已预解码帧的内存
+        self.buffers = [None] * self.slots
+        self.surfaces = [None] * self.slots
+        self.next_slot = 0
+
+    def _slot_buffer(self, slot):
+        buffer = self.buffers[slot]
+        if buffer is None:
+            target_width, target_height = self.layout.target_size
+            buffer = np.empty((target_height, target_width, 3), np.uint8)
+            self.buffers[slot] = buffer
+            # Surface 直接引用缓冲区内存，按 BGR 解释，方向与 numpy 行优先布局一致
+            self.surfaces[slot] = pygame.image.frombuffer(buffer, self.layout.target_size, "BGR")
+        return buffer
+
+    def read(self, cap, stages=None):
+        """读取并上传下一帧，返回 (surface, layout)；视频结束时返回 None。stages 为可选的分阶段计时"""
+        if self._pending_screen_size is not None:
+            self.screen_size, self._pending_screen_size = self._pending_screen_size, None
+            if self.layout is not None:
+                self._allocate(*self.layout.frame_size)
+
+        layout = self.layout
+        slot = self.next_slot
+        if layout is not None and layout.target_size == layout.frame_size:
+            # 视频尺寸与目标一致，直接解码进缓冲区
+            ret, frame = cap.read(self._slot_buffer(slot))
+        elif self.raw is not None:
+            ret, frame = cap.read(self.raw)
+        else:
+            ret, frame = cap.read()
+        if stages:
+            stages.lap(READ)
+        if not ret:
+            return None
+
+        height, width = frame.shape[:2]
+        if layout is None or layout.frame_size != (width, height):
+            self._allocate(width, height)
+            layout = self.layout
+            slot = 0
+
+        buffer = self._slot_buffer(slot)
+        if frame is not buffer:
+            if layout.target_size == layout.frame_size:
+                buffer[...] = frame
+            else:
+                self.raw = frame
+                cv2.resize(frame, layout.target_size, dst=buffer, interpolation=self.interpolation)
+        if stages:
+            stages.lap(RESIZE)
+        self.last_buffer = buffer
+        self.next_slot = (slot + 1) % self.slots
+        return self.surfaces[slot], layout
+
+
+class DecodedFrame:
+    """解码线程产出的一帧：帧序号、Surface 及其布局"""
+
+    def __init__(self, index, surface, layout):
+        self.index = index
+        self.surface = surface
+        self.layout = layout
+
+
+class FrameDecoder:
+    """后台解码线程：提前读取、转换视频帧并放入有界队列，渲染循环只负责绘制和翻转"""
+
+    def __init__(self, cap, screen_width, screen_height, queue_size=8, prefetch_limit=None, recorder=None,
+                 profiler=None, start_index=0):
+        self.cap = cap
+        self.start_index = start_index  # cap 已定位到的帧号，帧序号从这里开始
+        self.recorder = recorder  # 帧缓存写入器，完整播放一遍后缓存生效
+        self.stages = profiler.decoder_ring() if profiler else None  # 可选的分阶段计时
+        self.frames = queue.Queue(maxsize=max(1, int(queue_size)))
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        # 缓冲区数量 = 队列深度 + 正在显示的一帧 + 正在解码的一帧
+        self.uploader = FrameUploader(screen_width, screen_height, self.frames.maxsize + 2, frame_size)
+        self._stop_event = threading.Event()
+        # 预取模式下只预解码前 prefetch_limit 帧，开始播放后解除限制
+        self.prefetch_limit = prefetch_limit
+        self._unlimited = threading.Event()
+        if prefetch_limit is None:
+            self._unlimited.set()
+        # 播放落后时由渲染循环设置，解码线程只 grab 不解码地跳到该帧
+        self._skip_target = 0
+        self.skipped_frames = 0
+        # 快进时每 step 帧只解码一帧，其余只 grab，不越过 step_limit（下一个触发点）
+        self.step = 1
+        self.step_limit = None
+        self._thread = threading.Thread(target=self._run, name="FrameDecoder", daemon=True)
+        self.finished = False  # 消费端已取到结束标记
+        # stop() 等待超时时解码线程可能仍在 cap 上读取，此时改由解码线程退出时释放 cap
+        self._exit_lock = threading.Lock()
+        self._exited = False
+        self._release_on_exit = False
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        """阻塞放入队列，直到成功或收到停止信号"""
+        while not self._stop_event.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _wait_unlimited(self):
+        while not self._unlimited.wait(0.1):
+            if self._stop_event.is_set():
+                return False
+        return True
+
+    def _run(self):
+        try:
+            self._decode()
+        except Exception as e:
+            print(f"解码线程出错: {e}")
+            if self.recorder is not None:
+                self.recorder.abort()
+        finally:
+            # 无论正常结束还是出错都放入结束标记，避免 get() 永远阻塞（已停止时 _put 直接返回）
+            self._put(None)
+            if self._stop_event.is_set() and self.recorder is not None:
+                self.recorder.abort()
+            with self._exit_lock:
+                self._exited = True
+                if self._release_on_exit:
+                    self.cap.release()
+
+    def _decode(self):
+        index = self.start_index
+        stages = self.stages
+        while not self._stop_event.is_set():
+            if index - self.start_index == self.prefetch_limit and not self._wait_unlimited():
+                return
+            if stages:
+                stages.begin()
+            skip_target = self._skip_target
+            step = self.step
+            if step > 1:
+                step_target = index + step - 1
+                if self.step_limit is not None:
+                    step_target = min(step_target, self.step_limit)
+                skip_target = max(skip_target, step_target)
+            while index < skip_target and not self._stop_event.is_set():
+                if not self.cap.grab():
+                    break
+                index += 1
+                self.skipped_frames += 1
+            if stages:
+                stages.lap(GRAB)
+            uploaded = self.uploader.read(self.cap, stages)
+            if uploaded is None:
+                break
+            surface, layout = uploaded
+            if self.recorder is not None:
+                self.recorder.write(index, self.uploader.last_buffer, layout)
+            if stages:
+                stages.lap(RECORD)
+            if not self._put(DecodedFrame(index, surface, layout)):
+                return
+            if stages:
+                stages.lap(QUEUE)
+                stages.end()
+            index += 1
+        if self.recorder is not None and not self._stop_event.is_set():
+            self.recorder.finish()
+
+    def get(self):
+        """取出下一帧（按解码顺序），视频结束时返回 None"""
+        if self.finished:
+            return None
+        self._unlimited.set()  # 开始取帧即视为正式播放
+        item = self.frames.get()
+        if item is None:
+            self.finished = True
+        return item
+
+    def skip_to(self, index):
+        """让解码线程跳过 index 之前尚未解码的帧（只 grab，不解码、不转换）"""
+        if index > self._skip_target:
+            self._skip_target = index
+
+    def fast_forward(self, step, limit=None):
+        """快进：每 step 帧只解码一帧，其余只 grab；limit 为不能越过的帧号（该帧一定会被解码）。step 为 1 时恢复逐帧解码"""
+        self.step_limit = limit
+        self.step = max(1, int(step))
+
+    def release_limit(self):
+        """开始正式播放：解除预取帧数限制"""
+        self._unlimited.set()
+
+    def resize_screen(self, screen_width, screen_height):
+        """窗口尺寸变化时通知解码线程按新布局缩放"""
+        self.uploader.resize_screen(screen_width, screen_height)
+
+    def set_interpolation(self, interpolation):
+        """之后解码的帧按 interpolation（cv2.INTER_*）缩放"""
+        self.uploader.interpolation = interpolation
+
+    def depth(self):
+        """当前队列中已就绪的帧数"""
+        return self.frames.qsize()
+
+    def stop(self):
+        """停止解码线程并释放视频"""
+        self._stop_event.set()
+        # 清空队列，避免解码线程阻塞在 put 上
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        with self._exit_lock:
+            if self._thread.ident is not None and not self._exited:
+                # 解码线程仍未退出（例如阻塞在 cap.read() 中），由它退出时释放，避免释放正在使用的 cap
+                self._release_on_exit = True
+                return
+        if self.recorder is not None:
+            self.recorder.abort()
+        self.cap.release()